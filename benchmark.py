@@ -0,0 +1,496 @@
+# benchmark.py
+"""性能基准：生成可复现的合成语料，分阶段及端到端测量吞吐、延迟与内存
+
+用法示例：
+    python benchmark.py generate --out bench_corpus --files 200 --seed 1
+    python benchmark.py run --corpus bench_corpus --report report.json
+    python benchmark.py run --corpus bench_corpus --baseline report.json
+    python benchmark.py translation --sentences 200 --threads 4
+"""
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from collections import Counter
+from typing import Callable, Dict, List, Optional
+from config import Config
+from translator import Translator
+import argparse
+import contextlib
+import json
+import os
+import random
+import re
+import shutil
+import sys
+import tempfile
+import time
+
+CHINESE_WORDS = [
+    "数据", "报告", "分析", "系统", "项目", "管理", "合同", "财务", "市场", "客户",
+    "技术", "研究", "方案", "计划", "质量", "服务", "产品", "销售", "风险", "预算",
+    "会议", "部门", "目标", "结果", "问题", "流程", "文件", "统计", "发展", "政策",
+]
+ENGLISH_WORDS = [
+    "report", "data", "total", "analysis", "system", "project", "contract", "budget",
+    "market", "customer", "quality", "service", "product", "sales", "risk", "meeting",
+    "summary", "review", "annual", "quarter", "revenue", "growth", "policy", "result",
+]
+FORMATS = (".txt", ".docx", ".xlsx", ".xls", ".pdf")
+
+
+class CorpusGenerator:
+    """合成多格式语料生成器（相同参数与种子生成相同内容）"""
+
+    def __init__(self, seed: int = 1, english_ratio: float = 0.3, table_density: float = 0.3,
+                 paragraphs: int = 20, depth: int = 2, fanout: int = 3):
+        self.random = random.Random(seed)
+        self.english_ratio = english_ratio
+        self.table_density = table_density
+        self.paragraphs = paragraphs
+        self.depth = depth
+        self.fanout = fanout
+
+    def generate(self, out_dir: str, files: int, formats=FORMATS) -> List[str]:
+        out = Path(out_dir)
+        out.mkdir(parents=True, exist_ok=True)
+        folders = self._folders(out)
+        writers = {ext: getattr(self, f"_write_{ext[1:]}") for ext in formats}
+        created, skipped = [], set()
+        for index in range(files):
+            ext = formats[index % len(formats)]
+            path = self.random.choice(folders) / f"doc_{index:06d}{ext}"
+            try:
+                writers[ext](path)
+            except ImportError as e:
+                skipped.add(f"{ext}（{e.name}未安装）")
+                continue
+            created.append(str(path))
+        if skipped:
+            print(f"已跳过: {', '.join(sorted(skipped))}")
+        return created
+
+    def _folders(self, root: Path) -> List[Path]:
+        folders, level = [root], [root]
+        for depth in range(self.depth):
+            level = [parent / f"dir_{depth}_{i}" for parent in level for i in range(self.fanout)]
+            folders.extend(level)
+        for folder in folders:
+            folder.mkdir(parents=True, exist_ok=True)
+        return folders
+
+    def sentence(self) -> str:
+        if self.random.random() < self.english_ratio:
+            words = self.random.choices(ENGLISH_WORDS, k=self.random.randint(4, 12))
+            return " ".join(words).capitalize() + "."
+        return "".join(self.random.choices(CHINESE_WORDS, k=self.random.randint(4, 12))) + "。"
+
+    def paragraph(self) -> str:
+        return "".join(self.sentence() for _ in range(self.random.randint(2, 6)))
+
+    def table(self) -> List[List[str]]:
+        cols = self.random.randint(2, 6)
+        return [
+            [self.random.choice(CHINESE_WORDS + ENGLISH_WORDS) if c else str(self.random.randint(1, 10 ** 6))
+             for c in range(cols)]
+            for _ in range(self.random.randint(3, 30))
+        ]
+
+    def _write_txt(self, path: Path) -> None:
+        path.write_text("\n".join(self.paragraph() for _ in range(self.paragraphs)), encoding="utf-8")
+
+    def _write_docx(self, path: Path) -> None:
+        import docx
+        document = docx.Document()
+        for _ in range(self.paragraphs):
+            document.add_paragraph(self.paragraph())
+            if self.random.random() < self.table_density:
+                rows = self.table()
+                table = document.add_table(rows=len(rows), cols=len(rows[0]))
+                for row, values in zip(table.rows, rows):
+                    for cell, value in zip(row.cells, values):
+                        cell.text = value
+        document.save(str(path))
+
+    def _write_xlsx(self, path: Path) -> None:
+        import openpyxl
+        workbook = openpyxl.Workbook()
+        sheet = workbook.active
+        for _ in range(max(1, int(self.paragraphs * (1 + self.table_density * 10)))):
+            sheet.append(self.table()[0] + [self.sentence()])
+        workbook.save(str(path))
+
+    def _write_xls(self, path: Path) -> None:
+        import xlwt
+        workbook = xlwt.Workbook(encoding="utf-8")
+        sheet = workbook.add_sheet("Sheet1")
+        for row_idx in range(max(1, int(self.paragraphs * (1 + self.table_density * 10)))):
+            for col_idx, value in enumerate(self.table()[0] + [self.sentence()]):
+                sheet.write(row_idx, col_idx, value)
+        workbook.save(str(path))
+
+    def _write_pdf(self, path: Path) -> None:
+        from reportlab.pdfbase import pdfmetrics
+        from reportlab.pdfbase.cidfonts import UnicodeCIDFont
+        from reportlab.pdfgen import canvas
+        if "STSong-Light" not in pdfmetrics.getRegisteredFontNames():
+            pdfmetrics.registerFont(UnicodeCIDFont("STSong-Light"))
+        pdf = canvas.Canvas(str(path))
+        y = 800
+        for _ in range(self.paragraphs):
+            text = self.paragraph()
+            for start in range(0, len(text), 40):
+                if y < 60:
+                    pdf.showPage()
+                    y = 800
+                pdf.setFont("STSong-Light", 10)
+                pdf.drawString(40, y, text[start:start + 40])
+                y -= 14
+        pdf.save()
+
+
+class StandInTranslator(Translator):
+    """离线替身翻译器：不加载模型，按批模拟生成耗时，用于测量批处理与缓存开销"""
+
+    def __init__(self, batch_latency: float = 0.02, item_latency: float = 0.002):
+        self.batch_latency = batch_latency
+        self.item_latency = item_latency
+        super().__init__()
+
+    def _load_model(self):
+        return None, None
+
+    def _generate(self, texts: List[str]) -> List[str]:
+        """只替换模型推理，批内去重与缓存写入仍走 translate_batch"""
+        time.sleep(self.batch_latency + self.item_latency * len(texts))
+        return [f"[zh]{text}" for text in texts]
+
+
+def peak_rss_mb() -> Optional[float]:
+    """进程峰值常驻内存（MB）"""
+    try:
+        import resource
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return round(peak / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+    except ImportError:
+        pass
+    try:
+        import psutil
+        return round(psutil.Process().memory_info().peak_wset / 1024 ** 2, 1)
+    except (ImportError, AttributeError):
+        return None
+
+
+def summarize(files: int, latencies: List[float], total_bytes: int, seconds: float, errors: int) -> Dict:
+    ordered = sorted(latencies)
+
+    def percentile(p: float) -> Optional[float]:
+        if not ordered:
+            return None
+        return round(ordered[min(len(ordered) - 1, int(round(p / 100 * (len(ordered) - 1))))] * 1000, 2)
+
+    return {
+        "files": files,
+        "errors": errors,
+        "seconds": round(seconds, 3),
+        "files_per_sec": round(files / seconds, 2) if seconds else None,
+        "mb_per_sec": round(total_bytes / 1024 ** 2 / seconds, 3) if seconds and total_bytes else None,
+        "latency_ms": {"p50": percentile(50), "p95": percentile(95), "p99": percentile(99)},
+        "peak_rss_mb": peak_rss_mb(),
+    }
+
+
+def timed_map(func: Callable, items: List, workers: int = 1):
+    """对每个元素计时执行，返回 (结果列表, 各元素耗时, 总耗时, 错误数)"""
+    def run(item):
+        start = time.perf_counter()
+        try:
+            result = func(item)
+        except Exception:
+            result = None
+        return result, time.perf_counter() - start
+
+    start = time.perf_counter()
+    if workers > 1:
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            pairs = list(executor.map(run, items))
+    else:
+        pairs = [run(item) for item in items]
+    elapsed = time.perf_counter() - start
+    results = [result for result, _ in pairs]
+    return results, [duration for _, duration in pairs], elapsed, sum(result is None for result in results)
+
+
+class Benchmark:
+    """分阶段基准：discover → extract → analyze → translate，以及端到端 DocumentProcessor"""
+
+    STAGES = ("discover", "extract", "analyze", "translate", "e2e")
+
+    def __init__(self, corpus: str, stages=STAGES, batch_latency: float = 0.02):
+        self.corpus = corpus
+        self.stages = stages
+        self.batch_latency = batch_latency
+        # 关闭持久缓存，保证每次测量的是冷启动性能
+        Config.TRANSLATION_CACHE_PATH = ""
+        Config.TEXT_CACHE_PATH = ""
+        Config.TIMING_STATS_PATH = ""  # 基准语料的耗时不计入实际运行的超时预算
+
+    def run(self) -> Dict:
+        from file_processor import FileProcessor
+        from summary_generator import SummaryGenerator
+        from text_extractor import TextExtractor
+
+        report = {"corpus": self.corpus, "config": self._config(), "stages": {}}
+        start = time.perf_counter()
+        files = sorted(FileProcessor.get_all_files(self.corpus))
+        sizes = {path: os.path.getsize(path) for path in files}
+        total_bytes = sum(sizes.values())
+        if "discover" in self.stages:
+            report["stages"]["discover"] = summarize(len(files), [], 0, time.perf_counter() - start, 0)
+
+        texts, analyses, inputs = [], [], []
+        if {"extract", "analyze", "translate"} & set(self.stages):
+            texts, latencies, elapsed, errors = timed_map(TextExtractor.extract, files)
+            if "extract" in self.stages:
+                report["stages"]["extract"] = summarize(len(files), latencies, total_bytes, elapsed, errors)
+
+        if {"analyze", "translate"} & set(self.stages):
+            # 路径与文本一起过滤，空文本或提取失败的文件不参与分析
+            inputs = [(path, text) for path, text in zip(files, texts) if text]
+            analyses, latencies, elapsed, errors = timed_map(
+                SummaryGenerator._analyze_text, [text for _, text in inputs]
+            )
+            if "analyze" in self.stages:
+                chars = sum(len(text.encode("utf-8")) for _, text in inputs)
+                report["stages"]["analyze"] = summarize(len(inputs), latencies, chars, elapsed, errors)
+
+        if "translate" in self.stages:
+            translator = StandInTranslator(self.batch_latency)
+            generator = SummaryGenerator(translator)
+            jobs = [(path, analysis) for (path, _), analysis in zip(inputs, analyses) if analysis]
+            _, latencies, elapsed, errors = timed_map(
+                lambda job: generator._generate_translations(*job), jobs, Config.MAX_WORKERS
+            )
+            translator.close()
+            report["stages"]["translate"] = summarize(len(jobs), latencies, 0, elapsed, errors)
+            report["stages"]["translate"]["cache"] = translator.cache.stats()
+
+        if "e2e" in self.stages:
+            report["stages"]["e2e"] = self._run_end_to_end(len(files), total_bytes)
+        return report
+
+    def _run_end_to_end(self, file_count: int, total_bytes: int) -> Dict:
+        from main import DocumentProcessor
+        target = tempfile.mkdtemp(prefix="bench_target_")
+        try:
+            processor = DocumentProcessor(StandInTranslator(self.batch_latency))
+            start = time.perf_counter()
+            # 处理过程的输出转到标准错误，保证标准输出只有JSON报告
+            with contextlib.redirect_stdout(sys.stderr):
+                processor.process(self.corpus, target)
+            elapsed = time.perf_counter() - start
+            errors = len(processor.summary_gen.error_files)
+        finally:
+            shutil.rmtree(target, ignore_errors=True)
+        return summarize(file_count, [], total_bytes, elapsed, errors)
+
+    @staticmethod
+    def _config() -> Dict:
+        return {
+            key: getattr(Config, key) for key in (
+                "EXECUTION_MODE", "MAX_WORKERS", "PROCESS_WORKERS",
+                "TRANSLATION_BATCH_SIZE", "TRANSLATION_BATCH_WAIT",
+            )
+        }
+
+
+TRANSLATION_PROFILES = {
+    "current": {
+        "TRANSLATION_BACKEND": "torch", "TRANSLATION_QUANTIZE": False,
+        "TRANSLATION_NUM_BEAMS": 5, "TRANSLATION_MAX_NEW_TOKENS": 0,
+    },
+    "beam2-int8": {
+        "TRANSLATION_BACKEND": "torch", "TRANSLATION_QUANTIZE": True,
+        "TRANSLATION_NUM_BEAMS": 2, "TRANSLATION_MAX_NEW_TOKENS": 256,
+    },
+    "greedy-int8": {
+        "TRANSLATION_BACKEND": "torch", "TRANSLATION_QUANTIZE": True,
+        "TRANSLATION_NUM_BEAMS": 1, "TRANSLATION_MAX_NEW_TOKENS": 256,
+    },
+    "greedy-onnx": {
+        "TRANSLATION_BACKEND": "onnx", "TRANSLATION_QUANTIZE": False,
+        "TRANSLATION_NUM_BEAMS": 1, "TRANSLATION_MAX_NEW_TOKENS": 256,
+    },
+}
+
+
+def chrf(hypothesis: str, reference: str, order: int = 3, beta: float = 2.0) -> float:
+    """字符n-gram F值（chrF），中文译文不依赖分词"""
+    hypothesis, reference = hypothesis.replace(" ", ""), reference.replace(" ", "")
+    precisions, recalls = [], []
+    for n in range(1, order + 1):
+        hyp = Counter(hypothesis[i:i + n] for i in range(len(hypothesis) - n + 1))
+        ref = Counter(reference[i:i + n] for i in range(len(reference) - n + 1))
+        if not hyp or not ref:
+            continue
+        overlap = sum((hyp & ref).values())
+        precisions.append(overlap / sum(hyp.values()))
+        recalls.append(overlap / sum(ref.values()))
+    if not precisions:
+        return 0.0
+    precision, recall = sum(precisions) / len(precisions), sum(recalls) / len(recalls)
+    if not precision and not recall:
+        return 0.0
+    return (1 + beta ** 2) * precision * recall / (beta ** 2 * precision + recall)
+
+
+class TranslationBenchmark:
+    """翻译推理配置对比：测量各配置的加载耗时与吞吐，并以第一个配置的译文为参照计算chrF"""
+
+    def __init__(self, sentences: List[str], profiles: Dict[str, Dict]):
+        self.sentences = sentences
+        self.profiles = profiles
+
+    def run(self) -> Dict:
+        report = {"sentences": len(self.sentences), "profiles": {}}
+        reference: Optional[List[Optional[str]]] = None
+        for name, overrides in self.profiles.items():
+            result, outputs = self._run_profile(overrides)
+            if outputs is not None:
+                if reference is None:
+                    reference = outputs
+                pairs = [(hyp, ref) for hyp, ref in zip(outputs, reference) if hyp and ref]
+                result["chrf"] = round(100 * sum(chrf(h, r) for h, r in pairs) / len(pairs), 2) if pairs else None
+            report["profiles"][name] = result
+        return report
+
+    def _run_profile(self, overrides: Dict):
+        from translation_cache import TranslationCache
+        saved = {key: getattr(Config, key) for key in overrides}
+        for key, value in overrides.items():
+            setattr(Config, key, value)
+        try:
+            translator = Translator(TranslationCache(None, memory_size=0, disk_size=0))
+            start = time.perf_counter()
+            try:
+                translator._ensure_model()
+            except Exception as e:
+                return {"settings": overrides, "error": str(e).splitlines()[0]}, None
+            load_seconds = time.perf_counter() - start
+            outputs: List[Optional[str]] = []
+            start = time.perf_counter()
+            for index in range(0, len(self.sentences), Config.TRANSLATION_BATCH_SIZE):
+                outputs.extend(translator.translate_batch(self.sentences[index:index + Config.TRANSLATION_BATCH_SIZE]))
+            elapsed = time.perf_counter() - start
+        finally:
+            for key, value in saved.items():
+                setattr(Config, key, value)
+        return {
+            "settings": overrides,
+            "load_seconds": round(load_seconds, 3),
+            "seconds": round(elapsed, 3),
+            "sentences_per_sec": round(len(self.sentences) / elapsed, 2) if elapsed else None,
+            "chars_per_sec": round(sum(map(len, self.sentences)) / elapsed, 1) if elapsed else None,
+            "failed": sum(output is None for output in outputs),
+            "peak_rss_mb": peak_rss_mb(),
+        }, outputs
+
+    @staticmethod
+    def sample_sentences(count: int, corpus: Optional[str] = None, seed: int = 1) -> List[str]:
+        """从语料中抽取英文句子；未指定语料时使用合成英文句子"""
+        sentences: List[str] = []
+        if corpus:
+            from file_processor import FileProcessor
+            from text_extractor import TextExtractor
+            for path in sorted(FileProcessor.get_all_files(corpus)):
+                try:
+                    text = TextExtractor.extract(path)
+                except Exception:
+                    continue
+                for line in re.split(r"(?<=[.!?])\s+|\n", text):
+                    line = line.strip()
+                    if len(line) > 10 and Translator.is_english(line):
+                        sentences.append(line)
+            random.Random(seed).shuffle(sentences)
+        else:
+            generator = CorpusGenerator(seed, english_ratio=1.0)
+            sentences = [generator.sentence() for _ in range(count)]
+        return sentences[:count]
+
+
+def compare(report: Dict, baseline: Dict, tolerance: float) -> List[str]:
+    """与基线比较：吞吐下降或p95延迟上升超过容差即视为退化"""
+    regressions = []
+    for stage, current in report["stages"].items():
+        previous = baseline.get("stages", {}).get(stage)
+        if not previous:
+            continue
+        old_rate, new_rate = previous.get("files_per_sec"), current.get("files_per_sec")
+        if old_rate and new_rate is not None and new_rate < old_rate * (1 - tolerance):
+            regressions.append(f"{stage}: 吞吐 {old_rate} → {new_rate} 文件/秒")
+        old_p95 = (previous.get("latency_ms") or {}).get("p95")
+        new_p95 = (current.get("latency_ms") or {}).get("p95")
+        if old_p95 and new_p95 is not None and new_p95 > old_p95 * (1 + tolerance):
+            regressions.append(f"{stage}: p95延迟 {old_p95} → {new_p95} ms")
+    return regressions
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="文档摘要流水线性能基准")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    generate = commands.add_parser("generate", help="生成合成语料")
+    generate.add_argument("--out", required=True)
+    generate.add_argument("--files", type=int, default=100)
+    generate.add_argument("--seed", type=int, default=1)
+    generate.add_argument("--paragraphs", type=int, default=20, help="每个文件的段落数（控制文件大小）")
+    generate.add_argument("--depth", type=int, default=2, help="目录嵌套层数")
+    generate.add_argument("--fanout", type=int, default=3, help="每层子目录数")
+    generate.add_argument("--table-density", type=float, default=0.3)
+    generate.add_argument("--english-ratio", type=float, default=0.3)
+    generate.add_argument("--formats", default=",".join(FORMATS))
+
+    run = commands.add_parser("run", help="执行基准测量")
+    run.add_argument("--corpus", required=True)
+    run.add_argument("--stages", default=",".join(Benchmark.STAGES))
+    run.add_argument("--report", help="JSON报告输出路径（默认输出到标准输出）")
+    run.add_argument("--baseline", help="用于比较的基线报告")
+    run.add_argument("--tolerance", type=float, default=0.1)
+    run.add_argument("--batch-latency", type=float, default=0.02, help="替身翻译器每批模拟耗时（秒）")
+
+    translation = commands.add_parser("translation", help="对比翻译推理配置的质量与吞吐（需本地模型）")
+    translation.add_argument("--corpus", help="从该目录抽取英文句子（默认使用合成句子）")
+    translation.add_argument("--sentences", type=int, default=200)
+    translation.add_argument("--profiles", default=",".join(TRANSLATION_PROFILES))
+    translation.add_argument("--threads", type=int, default=0, help="torch/onnxruntime 算子内线程数")
+    translation.add_argument("--report", help="JSON报告输出路径（默认输出到标准输出）")
+
+    args = parser.parse_args(argv)
+    if args.command == "generate":
+        generator = CorpusGenerator(
+            args.seed, args.english_ratio, args.table_density, args.paragraphs, args.depth, args.fanout
+        )
+        created = generator.generate(args.out, args.files, tuple(args.formats.split(",")))
+        print(f"已生成 {len(created)} 个文件: {args.out}")
+        return 0
+
+    if args.command == "translation":
+        Config.TORCH_INTRA_OP_THREADS = args.threads
+        sentences = TranslationBenchmark.sample_sentences(args.sentences, args.corpus)
+        profiles = {name: TRANSLATION_PROFILES[name] for name in args.profiles.split(",")}
+        report = TranslationBenchmark(sentences, profiles).run()
+    else:
+        report = Benchmark(args.corpus, tuple(args.stages.split(",")), args.batch_latency).run()
+    output = json.dumps(report, ensure_ascii=False, indent=2)
+    if args.report:
+        Path(args.report).write_text(output, encoding="utf-8")
+    else:
+        print(output)
+    if getattr(args, "baseline", None):
+        regressions = compare(report, json.loads(Path(args.baseline).read_text(encoding="utf-8")), args.tolerance)
+        for line in regressions:
+            print(f"性能退化 - {line}")
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
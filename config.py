@@ -3,32 +3,139 @@ import re
 from typing import Pattern, Set
 import os
 
+
+def default_cache_folder() -> str:
+    """平台缓存目录：Windows 为 %LOCALAPPDATA%，其他平台为 $XDG_CACHE_HOME 或 ~/.cache"""
+    if os.name == "nt":
+        base = os.environ.get("LOCALAPPDATA") or os.path.join(os.path.expanduser("~"), "AppData", "Local")
+    else:
+        base = os.environ.get("XDG_CACHE_HOME") or os.path.join(os.path.expanduser("~"), ".cache")
+    return os.path.join(base, "summary_nlp")
+
+
 class Config:
     # 文件配置
     SUPPORTED_EXTS: Set[str] = {'.txt', '.doc', '.docx', '.xls', '.xlsx', '.pdf'}
     TEMP_FILE_PATTERN: Pattern = re.compile(r'^~\$')
     OUTPUT_DIR: str = "摘要文件列表"
+    OUTPUT_LAYOUT: str = "mirror"  # "mirror" 按源目录结构输出；"hash" 按内容哈希输出
     COMBINED_FILENAME: str = "!摘要文件总览.txt"
     ERROR_FILENAME: str = "!过滤文件总览.txt"
+    MANIFEST_FILENAME: str = "!处理清单.json"
+    RESULT_DB_FILENAME: str = "!摘要结果.sqlite3"  # 结果库（含全文索引），总览与导出由它生成
+    RESULT_JSONL_FILENAME: str = "!摘要结果.jsonl"
+    RESULT_COMMIT_INTERVAL: float = 1.0  # 结果库提交间隔（秒）
+
+    # 结果写出（单个后台线程，工作线程只入队）
+    WRITER_QUEUE_SIZE: int = 1024  # 待写出操作上限，写出跟不上时阻塞提交方（背压）
+    WRITER_BATCH_SIZE: int = 256  # 每批最多执行的操作数，每批结束时刷新错误日志并提交结果库
 
     # 处理参数
     SUMMARY_LENGTH: int = 5
     KEYWORDS_LIMIT: int = 10
+    ANALYSIS_MAX_SENTENCES: int = 2000  # 超出时等距抽样，0表示不限制
+    TEXT_CLEAN_PATTERN: Pattern = re.compile(r"[^\u4e00-\u9fa5a-zA-Z0-9\s,\.!?，。！？]")  # 分析前删除的字符
     CELL_DELIMITER: str = " "
     LINE_DELIMITER: str = "\n"
+    DOCX_STREAMING: bool = True  # 流式解析docx，关闭则使用python-docx对象模型
+
+    # 纯文本流式读取（内存占用与文件大小无关）
+    TXT_CHUNK_BYTES: int = 1024 * 1024
+    TXT_MAX_CHARS: int = 2000000  # 每个文件送入分析的字符预算，超出时按句子均匀抽样
+    TXT_MAX_SENTENCE_CHARS: int = 2000  # 无断句符的超长片段按该长度切开
+
+    # 单个工作表的读取预算（超出后截断该表）
+    SHEET_MAX_ROWS: int = 50000
+    SHEET_MAX_CELLS: int = 1000000
+    SHEET_MAX_CHARS: int = 5000000
+
+    # PDF提取
+    PDF_MAX_PAGES: int = 100  # 每个文档最多提取的页数，0表示不限制
+    PDF_TEXT_ONLY: bool = False  # 仅解码文字，跳过逐字符布局分析（更快，但不做版面排序）
+    PDF_SHARD_MIN_PAGES: int = 32  # 页数达到该值才按页分片并行
+    PDF_SHARD_MIN_PAGES_PER_WORKER: int = 8
+    PDF_SHARD_WORKERS: int = os.cpu_count() or 2
 
     # 超时保护
-    PROCESS_TIMEOUT = 20
+    PROCESS_TIMEOUT = 20  # 默认超时（秒）；同类型文件的历史耗时不足时使用
+    ADAPTIVE_TIMEOUT: bool = True  # 按文件类型与大小、根据历史耗时估算每个文件的超时预算
+    TIMEOUT_MIN: float = 10  # 需覆盖工作进程首次导入解析库与分析库的时间
+    TIMEOUT_MAX: float = 300  # 预算上限；被隔离的文件重试时直接使用该值
+    TIMEOUT_SAFETY_FACTOR: float = 3.0  # 预算 = 历史耗时估算值 × 该系数
+    TIMEOUT_MIN_SAMPLES: int = 10  # 同类型文件至少有这么多次成功记录才估算预算
+    TIMEOUT_HISTORY_SIZE: int = 200  # 每种类型保留的最近耗时记录数
+
+    # 隔离：超时或导致工作进程崩溃的文件按内容哈希记录，退避期内跳过，内容变化后立即重试
+    QUARANTINE_FILENAME: str = "!隔离清单.json"
+    QUARANTINE_BACKOFF: float = 24 * 3600  # 首次失败后的退避时间（秒），之后每次失败翻倍
+    QUARANTINE_MAX_BACKOFF: float = 30 * 24 * 3600
 
     # 翻译模型
     TRANSLATION_MODEL: str = "Helsinki-NLP/opus-mt-en-zh"
     TRANSLATION_MAX_LENGTH: int = 512
+    TRANSLATION_CHUNK_TOKENS: int = 200  # 长文本按句切块，每块估算token上限（为译文长度留出余量）
     ENGLISH_PATTERN: Pattern = re.compile(r'^(?=.*[A-Za-z])[A-Za-z0-9\s.,!?&@#$%^*()\'"\-]+$')
 
+    # 批量翻译（批越大吞吐越高，等待窗口越长单条延迟越高）
+    TRANSLATION_BATCH_SIZE: int = 16
+    TRANSLATION_BATCH_WAIT: float = 0.05  # 攒批等待窗口（秒）
+    TRANSLATION_PRELOAD: bool = False  # 开始处理时即在后台加载模型；关闭则在首次需要翻译时加载
+
+    # CPU推理（各组合的质量/吞吐对比见 python benchmark.py translation）
+    TRANSLATION_BACKEND: str = "torch"  # "torch"；"onnx" 使用ONNX Runtime（需安装 optimum[onnxruntime]）
+    TRANSLATION_QUANTIZE: bool = False  # torch后端对线性层做动态int8量化
+    TRANSLATION_NUM_BEAMS: int = 5  # 1为贪心解码
+    TRANSLATION_MAX_NEW_TOKENS: int = 0  # 生成长度上限，0表示沿用 TRANSLATION_MAX_LENGTH
+    TORCH_INTRA_OP_THREADS: int = 0  # 单个算子内的并行线程数，0为框架默认
+    TORCH_INTER_OP_THREADS: int = 0  # 算子间并行线程数，0为框架默认
+
+    # 缓存目录（各目标目录共用，不放在可能是网络共享的目标目录中）；run --cache 可改用其他目录
+    CACHE_FOLDER: str = default_cache_folder()
+
+    # 翻译缓存
+    TRANSLATION_CACHE_PATH: str = os.path.join(CACHE_FOLDER, "translations.sqlite3")  # 置空则仅使用内存缓存
+    TRANSLATION_CACHE_MEMORY_SIZE: int = 20000
+    TRANSLATION_CACHE_DISK_SIZE: int = 1000000
+    TRANSLATION_ONNX_PATH: str = os.path.join(CACHE_FOLDER, "onnx")  # 导出的ONNX模型目录（不存在时自动导出）
+
+    # 提取文本缓存（按内容哈希寻址，置空则关闭）
+    TEXT_CACHE_PATH: str = os.path.join(CACHE_FOLDER, "text")
+    TEXT_CACHE_MAX_BYTES: int = 2 * 1024 ** 3
+
+    # 各类型文件的历史处理耗时（用于估算超时预算，置空则只使用本次运行的记录）
+    TIMING_STATS_PATH: str = os.path.join(CACHE_FOLDER, "timings.json")
+
     # 线程配置
     MAX_WORKERS: int = (os.cpu_count() or 2) * 2
+    MAX_PENDING_FILES: int = MAX_WORKERS * 4  # 在途文件上限（背压）
+    DISCOVERY_WORKERS: int = 8  # 并行遍历子目录的线程数，1为串行
+
+    # 执行模式："thread" 线程内提取分析；"process" 进程池提取分析（超时强制终止）；
+    # "pipeline" 分阶段流水线（IO线程读取 → 进程池提取分析 → 单线程翻译 → 单线程写出）
+    EXECUTION_MODE: str = "thread"
+    PROCESS_WORKERS: int = os.cpu_count() or 2
+    PIPELINE_IO_WORKERS: int = 8
+    PIPELINE_QUEUE_SIZE: int = 64  # 阶段间队列容量
+    PIPELINE_REPORT_INTERVAL: float = 30  # 定期打印各阶段状态的间隔（秒），0为关闭
+
+    # 运行指标（写入目标目录）
+    METRICS_FILENAME: str = "!运行指标.json"
+    PROMETHEUS_FILENAME: str = "summary_nlp.prom"
+    PROMETHEUS_PATH: str = ""  # 指定时改写到该路径（如 node_exporter 的 textfile 目录）
+    PROFILE_SLOWEST_FILES: int = 0  # 大于0时对每个文件做cProfile剖析，保留最慢的N个
+    PROFILE_MEMORY: bool = False  # 剖析时同时用tracemalloc记录内存峰值
+    PROFILE_DIRNAME: str = "!性能分析"
 
     # 源目录
     SOURCE_FOLDER: str = r"C:\Users\admin\Desktop\word_files"
     # 目标目录
     TARGET_FOLDER: str = r"C:\Users\admin\Desktop\summary_nlp"
+
+    @classmethod
+    def set_cache_folder(cls, folder: str) -> None:
+        """改用其他缓存目录：位于原缓存目录下的缓存路径随之移动，已置空（关闭）的缓存保持关闭"""
+        for attr in ("TRANSLATION_CACHE_PATH", "TRANSLATION_ONNX_PATH", "TEXT_CACHE_PATH", "TIMING_STATS_PATH"):
+            path = getattr(cls, attr)
+            if path and os.path.dirname(path) == cls.CACHE_FOLDER:
+                setattr(cls, attr, os.path.join(folder, os.path.basename(path)))
+        cls.CACHE_FOLDER = folder
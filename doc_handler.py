@@ -0,0 +1,234 @@
+# doc_handler.py
+from typing import Dict, List, Tuple
+import mmap
+import re
+import struct
+
+ENDOFCHAIN = 0xFFFFFFFE
+FREESECT = 0xFFFFFFFF
+NOSTREAM = 0xFFFFFFFF
+
+
+class CompoundFile:
+    """OLE复合文档（CFB）只读解析器，仅支持读取根存储下的流"""
+
+    SIGNATURE = b"\xd0\xcf\x11\xe0\xa1\xb1\x1a\xe1"
+
+    def __init__(self, data):
+        if len(data) < 512 or data[:8] != self.SIGNATURE:
+            raise ValueError("不是有效的OLE复合文档")
+        self.data = data
+        (
+            self.sector_shift, self.mini_sector_shift, _, _, num_fat_sectors,
+            first_dir_sector, _, self.mini_cutoff, first_minifat_sector,
+            num_minifat_sectors, first_difat_sector, num_difat_sectors,
+        ) = struct.unpack_from("<HH6sIIIIIIIII", data, 0x1E)
+        self.sector_size = 1 << self.sector_shift
+        self.mini_sector_size = 1 << self.mini_sector_shift
+        self.fat = self._read_fat(num_fat_sectors, first_difat_sector, num_difat_sectors)
+        self.entries = self._read_directory(first_dir_sector)
+        root = self.entries[0]
+        self.mini_stream = self._read_chain(root["start"], root["size"])
+        self.mini_fat = (
+            self._unpack_uint32(self._read_chain(first_minifat_sector, None))
+            if num_minifat_sectors else []
+        )
+        self.streams = self._root_streams()
+
+    def open_stream(self, name: str) -> bytes:
+        """按名称读取根存储下的流（不区分大小写）"""
+        entry = self.streams.get(name.lower())
+        if entry is None:
+            raise KeyError(name)
+        if entry["size"] < self.mini_cutoff:
+            return self._read_mini_chain(entry["start"], entry["size"])
+        return self._read_chain(entry["start"], entry["size"])
+
+    def has_stream(self, name: str) -> bool:
+        return name.lower() in self.streams
+
+    def _sector(self, index: int) -> bytes:
+        offset = (index + 1) * self.sector_size
+        return self.data[offset:offset + self.sector_size]
+
+    @staticmethod
+    def _unpack_uint32(raw: bytes) -> List[int]:
+        return list(struct.unpack(f"<{len(raw) // 4}I", raw[:len(raw) // 4 * 4]))
+
+    def _read_fat(self, num_fat_sectors: int, difat_sector: int, num_difat_sectors: int) -> List[int]:
+        difat = list(struct.unpack_from("<109I", self.data, 0x4C))
+        per_sector = self.sector_size // 4 - 1
+        for _ in range(num_difat_sectors):
+            if difat_sector in (ENDOFCHAIN, FREESECT):
+                break
+            values = self._unpack_uint32(self._sector(difat_sector))
+            difat.extend(values[:per_sector])
+            difat_sector = values[per_sector]
+        fat: List[int] = []
+        for sector in difat[:num_fat_sectors]:
+            fat.extend(self._unpack_uint32(self._sector(sector)))
+        return fat
+
+    def _read_chain(self, start: int, size) -> bytes:
+        chunks, sector, visited = [], start, 0
+        while sector not in (ENDOFCHAIN, FREESECT):
+            if sector >= len(self.fat) or visited > len(self.fat):
+                raise ValueError("OLE扇区链损坏")
+            chunks.append(self._sector(sector))
+            sector = self.fat[sector]
+            visited += 1
+        data = b"".join(chunks)
+        return data if size is None else data[:size]
+
+    def _read_mini_chain(self, start: int, size: int) -> bytes:
+        chunks, sector, visited = [], start, 0
+        while sector not in (ENDOFCHAIN, FREESECT):
+            if sector >= len(self.mini_fat) or visited > len(self.mini_fat):
+                raise ValueError("OLE迷你扇区链损坏")
+            offset = sector * self.mini_sector_size
+            chunks.append(self.mini_stream[offset:offset + self.mini_sector_size])
+            sector = self.mini_fat[sector]
+            visited += 1
+        return b"".join(chunks)[:size]
+
+    def _read_directory(self, first_dir_sector: int) -> List[Dict]:
+        raw = self._read_chain(first_dir_sector, None)
+        entries = []
+        for offset in range(0, len(raw) - 127, 128):
+            name_len, entry_type, _, left, right, child = struct.unpack_from("<HBBIII", raw, offset + 64)
+            start, size = struct.unpack_from("<IQ", raw, offset + 116)
+            if self.sector_shift == 9:
+                size &= 0xFFFFFFFF  # v3文件只使用低32位
+            name = raw[offset:offset + max(name_len - 2, 0)].decode("utf-16-le", errors="ignore")
+            entries.append({
+                "name": name, "type": entry_type, "left": left, "right": right,
+                "child": child, "start": start, "size": size,
+            })
+        if not entries or entries[0]["type"] != 5:
+            raise ValueError("OLE目录缺少根存储")
+        return entries
+
+    def _root_streams(self) -> Dict[str, Dict]:
+        """遍历根存储的直接子节点（忽略嵌入对象等子存储中的同名流）"""
+        streams: Dict[str, Dict] = {}
+        pending, seen = [self.entries[0]["child"]], set()
+        while pending:
+            index = pending.pop()
+            if index == NOSTREAM or index in seen or index >= len(self.entries):
+                continue
+            seen.add(index)
+            entry = self.entries[index]
+            if entry["type"] == 2:
+                streams[entry["name"].lower()] = entry
+            pending.extend((entry["left"], entry["right"]))
+        return streams
+
+
+class DocHandler:
+    """Word 97-2003 (.doc) 二进制格式文本提取：解析FIB与分段表（piece table）"""
+
+    FIB_IDENT = 0xA5EC
+    MIN_NFIB = 101  # Word 97 及以后
+    # 特殊字符映射：段落/单元格/换行/分页等转换为空白，对象占位符删除
+    SPECIAL_CHARS = str.maketrans({
+        "\r": "\n", "\x07": "\t", "\x0b": "\n", "\x0c": "\n", "\x0e": "\n",
+        "\x1e": "-", "\x1f": None, "\x01": None, "\x02": None, "\x03": None,
+        "\x04": None, "\x05": None, "\x08": None,
+    })
+    # 域：\x13 代码 \x14 结果 \x15（可嵌套），只保留结果部分
+    FIELD_MARK = re.compile(r"([\x13\x14\x15])")
+
+    @classmethod
+    def handle_doc(cls, file_path: str) -> str:
+        with open(file_path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+            ole = CompoundFile(data)
+            word = ole.open_stream("WordDocument")
+            table_name = cls._parse_fib_table_name(word)
+            if not ole.has_stream(table_name):
+                raise ValueError(f"Word文档缺少{table_name}流")
+            table = ole.open_stream(table_name)
+        text = cls._read_text(word, table)
+        return cls._clean(text)
+
+    @classmethod
+    def _parse_fib_table_name(cls, word: bytes) -> str:
+        ident, nfib = struct.unpack_from("<HH", word, 0)
+        if ident != cls.FIB_IDENT:
+            raise ValueError("不是有效的Word文档")
+        if nfib < cls.MIN_NFIB:
+            raise ValueError(f"不支持的Word版本(nFib={nfib})")
+        (flags,) = struct.unpack_from("<H", word, 0x0A)
+        if flags & 0x0100:
+            raise ValueError("Word文档已加密")
+        return "1Table" if flags & 0x0200 else "0Table"
+
+    @staticmethod
+    def _fib_offsets(word: bytes) -> Tuple[int, int, int, int, int]:
+        """读取FIB中的 ccpText, ccpFtn, ccpHdd, fcClx, lcbClx"""
+        pos = 32
+        (csw,) = struct.unpack_from("<H", word, pos)
+        pos += 2 + csw * 2
+        (cslw,) = struct.unpack_from("<H", word, pos)
+        lw_start = pos + 2
+        ccp_text, ccp_ftn, ccp_hdd = struct.unpack_from("<3i", word, lw_start + 12)
+        pos = lw_start + cslw * 4 + 2
+        fc_clx, lcb_clx = struct.unpack_from("<II", word, pos + 33 * 8)
+        return ccp_text, ccp_ftn, ccp_hdd, fc_clx, lcb_clx
+
+    @classmethod
+    def _read_text(cls, word: bytes, table: bytes) -> str:
+        ccp_text, ccp_ftn, ccp_hdd, fc_clx, lcb_clx = cls._fib_offsets(word)
+        pieces = cls._parse_piece_table(table[fc_clx:fc_clx + lcb_clx])
+        # 正文在前，页眉页脚位于脚注之后
+        ranges = [(0, ccp_text), (ccp_text + ccp_ftn, ccp_text + ccp_ftn + max(ccp_hdd, 0))]
+        result = []
+        for range_start, range_stop in ranges:
+            for cp_start, cp_stop, fc, compressed in pieces:
+                start, stop = max(cp_start, range_start), min(cp_stop, range_stop)
+                if start >= stop:
+                    continue
+                if compressed:
+                    offset = fc + (start - cp_start)
+                    result.append(word[offset:offset + stop - start].decode("cp1252", errors="replace"))
+                else:
+                    offset = fc + (start - cp_start) * 2
+                    result.append(word[offset:offset + (stop - start) * 2].decode("utf-16-le", errors="replace"))
+        return "".join(result)
+
+    @staticmethod
+    def _parse_piece_table(clx: bytes) -> List[Tuple[int, int, int, bool]]:
+        """解析Clx，返回 (起始CP, 结束CP, 文件偏移, 是否单字节压缩) 列表"""
+        pos = 0
+        while pos < len(clx) and clx[pos] == 0x01:
+            (cb_grpprl,) = struct.unpack_from("<H", clx, pos + 1)
+            pos += 3 + cb_grpprl
+        if pos >= len(clx) or clx[pos] != 0x02:
+            raise ValueError("Word文档分段表损坏")
+        (lcb,) = struct.unpack_from("<I", clx, pos + 1)
+        plc = clx[pos + 5:pos + 5 + lcb]
+        count = (lcb - 4) // 12
+        cps = struct.unpack_from(f"<{count + 1}I", plc, 0)
+        pieces = []
+        for index in range(count):
+            (fc_value,) = struct.unpack_from("<I", plc, (count + 1) * 4 + index * 8 + 2)
+            compressed = bool(fc_value & 0x40000000)
+            fc = fc_value & 0x3FFFFFFF
+            pieces.append((cps[index], cps[index + 1], fc // 2 if compressed else fc, compressed))
+        return pieces
+
+    @classmethod
+    def _clean(cls, text: str) -> str:
+        result = []
+        in_code: List[bool] = []  # 每层域当前是否处于代码部分
+        for token in cls.FIELD_MARK.split(text):
+            if token == "\x13":
+                in_code.append(True)
+            elif token == "\x14":
+                if in_code:
+                    in_code[-1] = False
+            elif token == "\x15":
+                if in_code:
+                    in_code.pop()
+            elif not any(in_code):
+                result.append(token)
+        return "".join(result).translate(cls.SPECIAL_CHARS).strip()
@@ -1,24 +1,95 @@
 # file_processor.py
+import hashlib
 import os
+import uuid
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from contextlib import contextmanager
 from pathlib import Path
-from typing import Generator, Set
+from typing import IO, Generator, Iterator, List, Optional, Tuple, Union
 from config import Config
 
 class FileProcessor:
     """文件处理工具类"""
+
+    @staticmethod
+    @contextmanager
+    def atomic_open(path: Path, mode: str = "w") -> Iterator[IO]:
+        """写入同目录下的临时文件，完成后原子替换目标，读者不会看到写了一半的文件
+
+        临时文件名含进程号与随机后缀，多个进程（或共享目标目录的多台主机）同时写同一目标也不会互相覆盖；
+        写入失败时删除临时文件。
+        """
+        tmp = path.with_name(f"{path.name}.{os.getpid()}.{uuid.uuid4().hex[:8]}.tmp")
+        try:
+            with tmp.open(mode, encoding=None if "b" in mode else "utf-8") as file:
+                yield file
+            os.replace(tmp, path)
+        except BaseException:
+            tmp.unlink(missing_ok=True)
+            raise
+
+    @staticmethod
+    def atomic_write(path: Path, data: Union[str, bytes]) -> None:
+        with FileProcessor.atomic_open(path, "wb" if isinstance(data, bytes) else "w") as file:
+            file.write(data)
     
     @staticmethod
-    def get_all_files(directory: str) -> Generator[str, None, None]:
-        """获取目录下所有支持的文件"""
-        for root, _, files in os.walk(directory):
-            for file in files:
-                if Config.TEMP_FILE_PATTERN.match(file):
-                    continue
-                path = Path(root) / file
-                if path.suffix.lower() in Config.SUPPORTED_EXTS:
-                    yield str(path)
+    def get_all_files(directory: str, workers: Optional[int] = None) -> Generator[str, None, None]:
+        """获取目录下所有支持的文件（边遍历边产出，子目录可并行遍历）"""
+        workers = Config.DISCOVERY_WORKERS if workers is None else workers
+        if workers <= 1:
+            pending = [directory]
+            while pending:
+                files, subdirs = FileProcessor._scan_dir(pending.pop())
+                yield from files
+                pending.extend(reversed(subdirs))
+            return
+
+        waiting = deque([directory])
+        running = set()
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="discovery") as executor:
+            while waiting or running:
+                # 限制同时进行的目录扫描数量，避免待遍历目录全部堆积在线程池中
+                while waiting and len(running) < workers * 2:
+                    running.add(executor.submit(FileProcessor._scan_dir, waiting.popleft()))
+                done, running = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    files, subdirs = future.result()
+                    waiting.extend(subdirs)
+                    yield from files
+
+    @staticmethod
+    def _scan_dir(path: str) -> Tuple[List[str], List[str]]:
+        """扫描单个目录，返回 (支持的文件, 子目录)；无法访问的目录忽略"""
+        files, subdirs = [], []
+        try:
+            with os.scandir(path) as entries:
+                for entry in entries:
+                    try:
+                        if entry.is_dir(follow_symlinks=False):
+                            subdirs.append(entry.path)
+                            continue
+                    except OSError:
+                        continue
+                    if Config.TEMP_FILE_PATTERN.match(entry.name):
+                        continue
+                    if os.path.splitext(entry.name)[1].lower() in Config.SUPPORTED_EXTS:
+                        files.append(entry.path)
+        except OSError:
+            pass
+        return files, subdirs
 
     @staticmethod
     def change_extension(path: str, new_ext: str = ".txt") -> str:
         """修改文件扩展名"""
         return str(Path(path).with_suffix(new_ext))
+
+    @staticmethod
+    def file_hash(path: str, chunk_size: int = 1 << 20) -> str:
+        """流式计算文件内容哈希"""
+        digest = hashlib.sha256()
+        with open(path, "rb") as f:
+            while chunk := f.read(chunk_size):
+                digest.update(chunk)
+        return digest.hexdigest()
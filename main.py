@@ -4,7 +4,15 @@ from translator import Translator
 from summary_generator import SummaryGenerator
 from pathlib import Path
 from config import Config
-from typing import Dict
+from typing import List, Optional
+from manifest import RunManifest
+from quarantine import Quarantine
+from result_store import ResultStore
+from metrics import Metrics
+from sharding import Shard
+import argparse
+import json
+import sys
 
 class DocumentProcessor:
     """文档处理流水线"""
@@ -14,15 +22,36 @@ class DocumentProcessor:
         self.summary_gen = SummaryGenerator(self.translator)
         self.file_mgr = FileManager()
 
-    def process(self, source_path: str, target_path: str) -> None:
-        """执行完整处理流程"""
+    def process(self, source_path: str, target_path: str, shard: Optional[Shard] = None) -> None:
+        """执行完整处理流程（指定分片时只处理该分片的文件）"""
         start_time = datetime.now()
-        self.summary_gen.process_files(source_path, target_path)
+        Metrics.reset()
+        if Config.TRANSLATION_PRELOAD:
+            self.translator.preload()
+        try:
+            self.summary_gen.process_files(source_path, target_path, shard)
+        finally:
+            self.translator.close()
         mid_time = datetime.now()
         
-        self.file_mgr.combine_results(target_path)
-        self.file_mgr.save_errors(self.summary_gen.error_files, target_path)
+        store = self.summary_gen.store
+        try:
+            self.file_mgr.combine_results(target_path, store)
+            self.file_mgr.export_results(target_path, store)
+        finally:
+            store.close()
         
+        cache = getattr(self.translator, "cache", None)
+        cache_stats = cache.stats() if cache is not None else None
+        if cache_stats is not None:
+            print(f"翻译缓存: {cache_stats}")
+        Metrics.write_report(
+            target_path,
+            execution_mode=Config.EXECUTION_MODE,
+            translation_cache=cache_stats,
+            pipeline=self.summary_gen.pipeline_stats,
+            errors=len(self.summary_gen.error_files),
+        )
         print(f"处理完成\n时间统计:"
               f"\n- 开始: {start_time}"
               f"\n- 分析完成: {mid_time}"
@@ -32,23 +61,104 @@ class FileManager:
     """文件管理工具"""
     
     @staticmethod
-    def combine_results(target_path: str) -> None:
-        """合并所有结果文件"""
-        source_dir = Path(target_path) / Config.OUTPUT_DIR
+    def combine_results(target_path: str, store: ResultStore) -> None:
+        """从结果库流式生成结果总览，无需重新读取结果文件"""
         combined_file = Path(target_path) / Config.COMBINED_FILENAME
-        
         with combined_file.open("w", encoding="utf-8") as output:
-            for file in sorted(source_dir.glob("*.txt")):
-                content = file.read_text(encoding="utf-8")
+            for content in store.overview():
                 output.write(f"{content}\n\n{'*'*90}\n")
 
     @staticmethod
-    def save_errors(error_dict: Dict, target_path: str) -> None:
-        """保存错误日志"""
-        error_file = Path(target_path) / Config.ERROR_FILENAME
-        content = [f"文件: {path}\n错误: {err}\n" for path, err in error_dict.items()]
-        error_file.write_text("\n".join(content), encoding="utf-8")
+    def export_results(target_path: str, store: ResultStore) -> int:
+        """导出结果库为JSON Lines，返回记录数"""
+        return store.export_jsonl(Path(target_path) / Config.RESULT_JSONL_FILENAME)
+
+    @classmethod
+    def merge_shards(cls, target_paths: List[str], output_path: str, count: Optional[int] = None) -> int:
+        """合并一次 N 分片运行的清单、结果库、错误日志与隔离清单，并重新生成结果总览与导出，返回合并的分片数"""
+        target_paths = list(dict.fromkeys(target_paths))
+        count = Shard.check_complete(target_paths, count)
+        manifest_files = Shard.find(target_paths, Config.MANIFEST_FILENAME, count)
+        Path(output_path).mkdir(parents=True, exist_ok=True)
+        RunManifest.merge(output_path, manifest_files).save()
+        store = ResultStore.merge(output_path, Shard.find(target_paths, Config.RESULT_DB_FILENAME, count))
+        try:
+            cls.combine_results(output_path, store)
+            cls.export_results(output_path, store)
+        finally:
+            store.close()
+        Quarantine.merge(output_path, Shard.find(target_paths, Config.QUARANTINE_FILENAME, count)).save()
+
+        errors = [
+            file.read_text(encoding="utf-8").strip()
+            for file in Shard.find(target_paths, Config.ERROR_FILENAME, count)
+        ]
+        error_file = Path(output_path) / Config.ERROR_FILENAME
+        error_file.write_text("\n\n".join(filter(None, errors)), encoding="utf-8")
+        return len(manifest_files)
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="文档摘要与翻译")
+    commands = parser.add_subparsers(dest="command")
+
+    run = commands.add_parser("run", help="处理源目录（默认命令）")
+    run.add_argument("--source", default=Config.SOURCE_FOLDER, help="源目录")
+    run.add_argument("--target", default=Config.TARGET_FOLDER, help="目标目录")
+    run.add_argument("--shard", type=Shard.parse, help="只处理第 i 个分片（i/N，i 从0开始），按相对路径哈希划分")
+    run.add_argument("--mode", choices=("thread", "process", "pipeline"), help="执行模式")
+    run.add_argument("--cache", help=f"缓存目录（翻译缓存、提取文本缓存、历史耗时），默认 {Config.CACHE_FOLDER}")
+
+    merge = commands.add_parser("merge", help="合并各分片的清单、结果库、错误日志与隔离清单")
+    merge.add_argument("targets", nargs="+", help="分片的目标目录（可以相同）")
+    merge.add_argument("--output", required=True, help="合并结果的输出目录")
+    merge.add_argument("--shards", type=int, help="分片数 N（默认按找到的分片清单推断）；须找到 0..N-1 的全部分片")
+
+    search = commands.add_parser("search", help="在结果库中全文检索文件名、关键词、摘要及译文")
+    search.add_argument("query", nargs="+", help="检索词（全部命中；中文按连续字符匹配）")
+    search.add_argument("--target", default=Config.TARGET_FOLDER, help="目标目录")
+    search.add_argument("--limit", type=int, default=20, help="最多返回的文件数")
+    search.add_argument("--json", action="store_true", help="以JSON Lines输出完整记录")
+
+    args = parser.parse_args(argv)
+    if args.command == "search":
+        return search_results(args.target, " ".join(args.query), args.limit, args.json)
+    if args.command == "merge":
+        count = FileManager.merge_shards(args.targets, args.output, args.shards)
+        print(f"已合并 {count} 个分片: {args.output}")
+        return 0
+
+    source = getattr(args, "source", Config.SOURCE_FOLDER)
+    target = getattr(args, "target", Config.TARGET_FOLDER)
+    shard = getattr(args, "shard", None)
+    if getattr(args, "mode", None):
+        Config.EXECUTION_MODE = args.mode
+    if getattr(args, "cache", None):
+        Config.set_cache_folder(args.cache)
+    if shard is not None:
+        shard.apply()
+    DocumentProcessor().process(source, target, shard)
+    return 0
+
+
+def search_results(target_path: str, query: str, limit: int, as_json: bool = False) -> int:
+    db_file = Path(target_path) / Config.RESULT_DB_FILENAME
+    if not db_file.exists():
+        print(f"未找到结果库: {db_file}", file=sys.stderr)
+        return 1
+    store = ResultStore(db_file)
+    try:
+        documents = store.search(query, limit)
+    finally:
+        store.close()
+    for document in documents:
+        if as_json:
+            print(json.dumps(document, ensure_ascii=False))
+        else:
+            print(f"{document['path']}\n  关键词: {','.join(document['keywords'])}"
+                  f"\n  摘要: {','.join(document['summary'])[:200]}")
+    return 0
+
 
 if __name__ == "__main__":
-    processor = DocumentProcessor()
-    processor.process(Config.SOURCE_FOLDER, Config.TARGET_FOLDER)
+    sys.exit(main())
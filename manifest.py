@@ -0,0 +1,160 @@
+# manifest.py
+from pathlib import Path
+from concurrent.futures import Future
+from typing import Dict, Iterable, Optional, Tuple
+from config import Config
+from file_processor import FileProcessor
+from text_extractor import TextExtractor
+from translator import Translator
+import hashlib
+import json
+import os
+import threading
+
+
+def config_fingerprint(ext: str) -> str:
+    """影响该类型文件输出结果的配置指纹：提取器版本与提取配置、分析配置、翻译配置及输出布局"""
+    raw = json.dumps([
+        TextExtractor._cache_version(ext),
+        Config.SUMMARY_LENGTH, Config.KEYWORDS_LIMIT, Config.ANALYSIS_MAX_SENTENCES, Config.TEXT_CLEAN_PATTERN.pattern,
+        Config.TRANSLATION_MODEL, Config.TRANSLATION_BACKEND, Config.TRANSLATION_QUANTIZE,
+        Config.TRANSLATION_CHUNK_TOKENS, Config.ENGLISH_PATTERN.pattern, Translator.generation_kwargs(),
+        Config.OUTPUT_LAYOUT,
+    ], sort_keys=True)
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()[:16]
+
+
+class RunManifest:
+    """运行清单：记录每个源文件的状态与输出位置，用于增量处理"""
+
+    def __init__(self, path: Path, entries: Optional[Dict[str, Dict]] = None):
+        self.path = path
+        self.entries: Dict[str, Dict] = entries or {}
+        self._fingerprints: Dict[str, str] = {}
+        self._lock = threading.Lock()
+        # 输出文件 -> 指向它的源文件集合
+        self._by_output: Dict[str, set] = {}
+        for path, entry in self.entries.items():
+            self._by_output.setdefault(entry["output"], set()).add(path)
+
+    @classmethod
+    def load(cls, target_path: str) -> "RunManifest":
+        path = Path(target_path) / Config.MANIFEST_FILENAME
+        entries = {}
+        if path.exists():
+            try:
+                entries = json.loads(path.read_text(encoding="utf-8")).get("files", {})
+            except (OSError, ValueError) as e:
+                print(f"运行清单读取失败，将全量处理: {e}")
+        return cls(path, entries)
+
+    @classmethod
+    def merge(cls, target_path: str, manifest_files: Iterable[Path]) -> "RunManifest":
+        """合并多个分片的清单（各分片的文件互不重叠）"""
+        entries: Dict[str, Dict] = {}
+        for file in manifest_files:
+            entries.update(json.loads(file.read_text(encoding="utf-8")).get("files", {}))
+        return cls(Path(target_path) / Config.MANIFEST_FILENAME, entries)
+
+    def fingerprint(self, file_path: str) -> str:
+        ext = Path(file_path).suffix.lower()
+        if ext not in self._fingerprints:
+            self._fingerprints[ext] = config_fingerprint(ext)
+        return self._fingerprints[ext]
+
+    def save(self) -> None:
+        """原子写入清单文件"""
+        with self._lock:
+            data = json.dumps({"files": self.entries}, ensure_ascii=False)
+        FileProcessor.atomic_write(self.path, data)
+
+    def check(self, file_path: str) -> Optional[Dict]:
+        """判断文件是否需要处理；需要时返回文件当前状态（含内容哈希），否则返回None"""
+        stat = os.stat(file_path)
+        state = {"size": stat.st_size, "mtime": stat.st_mtime, "hash": None}
+        with self._lock:
+            entry = self.entries.get(file_path)
+        unchanged = (
+            entry is not None
+            and entry.get("fingerprint") == self.fingerprint(file_path)
+            and entry["size"] == state["size"]
+            and Path(entry["output"]).exists()
+        )
+        if unchanged and entry["mtime"] == state["mtime"]:
+            return None
+        state["hash"] = FileProcessor.file_hash(file_path)
+        if unchanged and state["hash"] == entry["hash"]:
+            # 仅修改时间变化
+            with self._lock:
+                entry["mtime"] = state["mtime"]
+            return None
+        return state
+
+    def record(self, file_path: str, state: Dict, output_file: Path, duplicate_of: Optional[str] = None) -> None:
+        """记录处理成功的文件；内容与已处理文件相同时 duplicate_of 为该文件
+
+        输出文件只会被内容相同的文件共用（hash布局），原文件内容变化后重复文件的记录与输出仍然有效。
+        """
+        self._store(file_path, {
+            "size": state["size"],
+            "mtime": state["mtime"],
+            "hash": state["hash"] or FileProcessor.file_hash(file_path),
+            "fingerprint": self.fingerprint(file_path),
+            "output": str(output_file),
+            "duplicate_of": duplicate_of,
+        })
+
+    def _store(self, file_path: str, entry: Dict) -> None:
+        obsolete = None
+        with self._lock:
+            previous = self._remove(file_path)
+            self.entries[file_path] = entry
+            self._by_output.setdefault(entry["output"], set()).add(file_path)
+            if previous is not None and not self._by_output.get(previous["output"]):
+                obsolete = previous["output"]
+        if obsolete is not None:
+            Path(obsolete).unlink(missing_ok=True)
+
+    def _remove(self, file_path: str) -> Optional[Dict]:
+        """删除记录并维护输出索引（需持有锁）"""
+        entry = self.entries.pop(file_path, None)
+        if entry is not None:
+            users = self._by_output.get(entry["output"])
+            if users is not None:
+                users.discard(file_path)
+                if not users:
+                    del self._by_output[entry["output"]]
+        return entry
+
+    def prune(self, seen: Iterable[str]) -> None:
+        """移除已被删除的源文件记录及其输出"""
+        seen = set(seen)
+        with self._lock:
+            removed = [self._remove(path) for path in list(self.entries) if path not in seen]
+            orphaned = {entry["output"] for entry in removed if entry["output"] not in self._by_output}
+        for output in orphaned:
+            Path(output).unlink(missing_ok=True)
+
+    def retain(self, recorded: Iterable[str]) -> None:
+        """只保留结果库中有结果的记录，其余文件下次检查时重新处理（如结果库被删除）"""
+        recorded = set(recorded)
+        with self._lock:
+            for path in [path for path in self.entries if path not in recorded]:
+                self._remove(path)
+
+
+class DuplicateRegistry:
+    """本次运行的内容去重登记：每个内容哈希只由第一个文件处理，其余文件等待其结果"""
+
+    def __init__(self):
+        self._owners: Dict[str, Future] = {}
+        self._lock = threading.Lock()
+
+    def claim(self, digest: str) -> Tuple[bool, Future]:
+        """返回 (是否由调用方负责处理, 结果Future)；Future的结果为负责处理的文件的处理结果"""
+        with self._lock:
+            future = self._owners.get(digest)
+            if future is not None:
+                return False, future
+            future = self._owners[digest] = Future()
+            return True, future
@@ -0,0 +1,307 @@
+# metrics.py
+from bisect import bisect_left
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+from config import Config
+from file_processor import FileProcessor
+import cProfile
+import heapq
+import io
+import json
+import pstats
+import re
+import threading
+import time
+import tracemalloc
+
+TIME_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+SIZE_BUCKETS = tuple(1024 * 4 ** i for i in range(11))  # 1KB ~ 1GB
+COUNT_BUCKETS = (1, 2, 4, 8, 16, 32, 64, 128, 256, 512, 1024, 4096, 16384)
+
+LabelKey = Tuple[str, Tuple[Tuple[str, str], ...]]
+
+
+class Histogram:
+    """固定分桶直方图（桶上界含等于，语义与Prometheus一致）"""
+
+    def __init__(self, buckets: Tuple[float, ...]):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+        self.max = max(self.max, value)
+
+    def merge(self, data: Dict[str, Any]) -> None:
+        self.counts = [a + b for a, b in zip(self.counts, data["counts"])]
+        self.count += data["count"]
+        self.sum += data["sum"]
+        self.max = max(self.max, data["max"])
+
+    def quantile(self, q: float) -> Optional[float]:
+        """按分桶估算分位数（取所在桶的上界，不超过观测最大值）"""
+        if not self.count:
+            return None
+        rank, seen = q * self.count, 0
+        for index, count in enumerate(self.counts):
+            seen += count
+            if seen >= rank and count:
+                return min(self.buckets[index], self.max) if index < len(self.buckets) else self.max
+        return self.max
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {"counts": self.counts, "count": self.count, "sum": self.sum, "max": self.max}
+
+
+class MetricsRegistry:
+    """计数器与直方图集合；可生成可序列化快照，供跨进程汇总"""
+
+    def __init__(self, **labels: str):
+        self.labels = labels
+        self.counters: Dict[LabelKey, float] = {}
+        self.histograms: Dict[LabelKey, Histogram] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, name: str, value: float = 1, **labels: str) -> None:
+        key = self._key(name, labels)
+        with self._lock:
+            self.counters[key] = self.counters.get(key, 0) + value
+
+    def observe(self, name: str, value: float, **labels: str) -> None:
+        key = self._key(name, labels)
+        with self._lock:
+            histogram = self.histograms.get(key)
+            if histogram is None:
+                histogram = self.histograms[key] = Histogram(self._buckets(name))
+            histogram.observe(value)
+
+    def value(self, name: str, **labels: str) -> float:
+        """计数器当前值"""
+        key = self._key(name, labels)
+        with self._lock:
+            return self.counters.get(key, 0)
+
+    def snapshot(self) -> Dict[str, list]:
+        with self._lock:
+            return {
+                "counters": [(name, labels, value) for (name, labels), value in self.counters.items()],
+                "histograms": [(name, labels, h.to_dict()) for (name, labels), h in self.histograms.items()],
+            }
+
+    def merge(self, snapshot: Dict[str, list]) -> None:
+        with self._lock:
+            for name, labels, value in snapshot["counters"]:
+                key = (name, tuple(map(tuple, labels)))
+                self.counters[key] = self.counters.get(key, 0) + value
+            for name, labels, data in snapshot["histograms"]:
+                key = (name, tuple(map(tuple, labels)))
+                histogram = self.histograms.get(key)
+                if histogram is None:
+                    histogram = self.histograms[key] = Histogram(self._buckets(name))
+                histogram.merge(data)
+
+    def _key(self, name: str, labels: Dict[str, str]) -> LabelKey:
+        merged = dict(self.labels, **labels)
+        return name, tuple(sorted((k, str(v)) for k, v in merged.items()))
+
+    @staticmethod
+    def _buckets(name: str) -> Tuple[float, ...]:
+        if name.endswith("_seconds"):
+            return TIME_BUCKETS
+        if name.endswith(("_bytes", "_chars")):
+            return SIZE_BUCKETS
+        return COUNT_BUCKETS
+
+
+class Metrics:
+    """全局指标入口：各模块直接调用类方法记录；capture() 内的记录写入线程局部的临时集合"""
+
+    PREFIX = "summary_nlp_"
+    _registry = MetricsRegistry()
+    _local = threading.local()
+    _profiles: List[Tuple[float, str, Dict[str, Any]]] = []
+    _profiles_lock = threading.Lock()
+    _started = time.time()
+
+    @classmethod
+    def registry(cls) -> MetricsRegistry:
+        return getattr(cls._local, "registry", None) or cls._registry
+
+    @classmethod
+    def reset(cls) -> None:
+        cls._registry = MetricsRegistry()
+        cls._profiles = []
+        cls._started = time.time()
+
+    @classmethod
+    def inc(cls, name: str, value: float = 1, **labels: str) -> None:
+        cls.registry().inc(name, value, **labels)
+
+    @classmethod
+    def observe(cls, name: str, value: float, **labels: str) -> None:
+        cls.registry().observe(name, value, **labels)
+
+    @classmethod
+    @contextmanager
+    def timer(cls, name: str, **labels: str) -> Iterator[None]:
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            cls.observe(name, time.perf_counter() - start, **labels)
+
+    @classmethod
+    @contextmanager
+    def capture(cls, **labels: str) -> Iterator[MetricsRegistry]:
+        """当前线程内的记录改写到独立集合（附加统一标签），用于工作进程把指标随结果带回"""
+        previous = getattr(cls._local, "registry", None)
+        cls._local.registry = MetricsRegistry(**labels)
+        try:
+            yield cls._local.registry
+        finally:
+            cls._local.registry = previous
+
+    @classmethod
+    def merge(cls, snapshot: Optional[Dict[str, list]]) -> None:
+        if snapshot:
+            cls._registry.merge(snapshot)
+
+    @classmethod
+    @contextmanager
+    def profile(cls) -> Iterator[Dict[str, Any]]:
+        """可选性能剖析：开启 PROFILE_SLOWEST_FILES 时记录 cProfile 统计（及 tracemalloc 峰值）
+
+        tracemalloc 为进程级统计，线程模式下并发文件的内存会相互叠加，仅供参考。
+        Python 3.12 起同一时间只能启用一个剖析器，并发处理的其他文件不做剖析。
+        """
+        result: Dict[str, Any] = {}
+        if not Config.PROFILE_SLOWEST_FILES:
+            yield result
+            return
+        profiler = cProfile.Profile()
+        try:
+            profiler.enable()
+        except ValueError:
+            # 已有其他文件正在剖析
+            cls.inc("profile_skipped_total")
+            yield result
+            return
+        trace_memory = Config.PROFILE_MEMORY and not tracemalloc.is_tracing()
+        if trace_memory:
+            tracemalloc.start()
+        start = time.perf_counter()
+        try:
+            yield result
+        finally:
+            profiler.disable()
+            result["seconds"] = time.perf_counter() - start
+            if trace_memory:
+                result["memory_peak_bytes"] = tracemalloc.get_traced_memory()[1]
+                tracemalloc.stop()
+            out = io.StringIO()
+            pstats.Stats(profiler, stream=out).sort_stats("cumulative").print_stats(30)
+            result["stats"] = out.getvalue()
+
+    @classmethod
+    def record_profile(cls, file_path: str, profile: Optional[Dict[str, Any]]) -> None:
+        """保留耗时最长的N个文件的剖析结果"""
+        if not profile or "seconds" not in profile:
+            return
+        with cls._profiles_lock:
+            item = (profile["seconds"], file_path, profile)
+            if len(cls._profiles) < Config.PROFILE_SLOWEST_FILES:
+                heapq.heappush(cls._profiles, item)
+            elif item[0] > cls._profiles[0][0]:
+                heapq.heapreplace(cls._profiles, item)
+
+    @classmethod
+    def report(cls, **extra: Any) -> Dict[str, Any]:
+        snapshot = cls._registry.snapshot()
+        counters: Dict[str, list] = {}
+        for name, labels, value in snapshot["counters"]:
+            counters.setdefault(name, []).append({"labels": dict(labels), "value": value})
+        histograms: Dict[str, list] = {}
+        for (name, labels), histogram in list(cls._registry.histograms.items()):
+            histograms.setdefault(name, []).append({
+                "labels": dict(labels),
+                "count": histogram.count,
+                "sum": round(histogram.sum, 6),
+                "mean": round(histogram.sum / histogram.count, 6) if histogram.count else None,
+                "max": histogram.max,
+                "p50": histogram.quantile(0.5),
+                "p95": histogram.quantile(0.95),
+                "p99": histogram.quantile(0.99),
+            })
+        slowest = [
+            {"path": path, "seconds": round(seconds, 3), "memory_peak_bytes": profile.get("memory_peak_bytes")}
+            for seconds, path, profile in sorted(cls._profiles, reverse=True)
+        ]
+        return dict(
+            extra, started=cls._started, seconds=round(time.time() - cls._started, 3),
+            counters=counters, histograms=histograms, slowest_files=slowest,
+        )
+
+    @classmethod
+    def prometheus(cls) -> str:
+        """Prometheus 文本格式（供 node_exporter textfile collector 读取）"""
+        lines: List[str] = []
+        typed = set()
+        registry = cls._registry
+        for (name, labels), value in sorted(registry.counters.items()):
+            if name not in typed:
+                lines.append(f"# TYPE {cls.PREFIX}{name} counter")
+                typed.add(name)
+            lines.append(f"{cls.PREFIX}{name}{cls._labels(labels)} {value}")
+        for (name, labels), histogram in sorted(registry.histograms.items()):
+            if name not in typed:
+                lines.append(f"# TYPE {cls.PREFIX}{name} histogram")
+                typed.add(name)
+            cumulative = 0
+            for bound, count in zip(histogram.buckets + (float("inf"),), histogram.counts):
+                cumulative += count
+                le = "+Inf" if bound == float("inf") else repr(bound)
+                lines.append(f"{cls.PREFIX}{name}_bucket{cls._labels(labels + (('le', le),))} {cumulative}")
+            lines.append(f"{cls.PREFIX}{name}_sum{cls._labels(labels)} {histogram.sum}")
+            lines.append(f"{cls.PREFIX}{name}_count{cls._labels(labels)} {histogram.count}")
+        return "\n".join(lines) + "\n"
+
+    @classmethod
+    def write_report(cls, target_path: str, **extra: Any) -> None:
+        """写出JSON运行报告、Prometheus文本文件及最慢文件的剖析结果"""
+        target = Path(target_path)
+        cls._atomic_write(
+            target / Config.METRICS_FILENAME,
+            json.dumps(cls.report(**extra), ensure_ascii=False, indent=2, default=str),
+        )
+        cls._atomic_write(Path(Config.PROMETHEUS_PATH or target / Config.PROMETHEUS_FILENAME), cls.prometheus())
+        if cls._profiles:
+            profile_dir = target / Config.PROFILE_DIRNAME
+            profile_dir.mkdir(parents=True, exist_ok=True)
+            for rank, (seconds, path, profile) in enumerate(sorted(cls._profiles, reverse=True), 1):
+                name = re.sub(r"[^\w.\-]", "_", Path(path).name)
+                (profile_dir / f"{rank:02d}_{name}.txt").write_text(
+                    f"文件: {path}\n耗时: {seconds:.3f}秒\n"
+                    f"内存峰值: {profile.get('memory_peak_bytes')}\n\n{profile['stats']}",
+                    encoding="utf-8",
+                )
+
+    @staticmethod
+    def _labels(labels: Tuple[Tuple[str, str], ...]) -> str:
+        if not labels:
+            return ""
+        escaped = (
+            key + '="' + value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") + '"'
+            for key, value in labels
+        )
+        return "{" + ",".join(escaped) + "}"
+
+    @staticmethod
+    def _atomic_write(path: Path, text: str) -> None:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        FileProcessor.atomic_write(path, text)
@@ -0,0 +1,107 @@
+# output_writer.py
+from pathlib import Path
+from typing import Any, Callable, List, Optional, Set
+from config import Config
+from file_processor import FileProcessor
+from metrics import Metrics
+import queue
+import threading
+import time
+
+_STOP = object()
+
+
+class OutputWriter:
+    """结果写出线程：所有落到目标目录的写操作经队列交给单个后台线程，工作线程不等待目标盘
+
+    每次取出队列中已有的一批操作依次执行：目录只在首次用到时创建，结果文件经临时文件+重命名
+    原子写入，错误日志随写随追加，整批完成后统一刷新（错误日志、结果库提交等）。
+    同一线程按提交顺序执行，后提交的操作能看到先前操作的结果。
+    """
+
+    def __init__(self, error_file: Path, on_flush: Optional[List[Callable[[], None]]] = None):
+        self.on_flush = on_flush or []
+        self._queue: "queue.Queue[Any]" = queue.Queue(maxsize=Config.WRITER_QUEUE_SIZE)
+        self._dirs: Set[Path] = set()
+        # 错误日志在运行开始时清空，之后逐条追加，中途崩溃也保留已发生的错误
+        self._errors = error_file.open("w", encoding="utf-8")
+        self._thread = threading.Thread(target=self._run, name="output-writer", daemon=True)
+        self._thread.start()
+
+    def write(self, path: Path, text: str, done: Callable[[Optional[Exception]], None]) -> None:
+        """原子写入结果文件；写出后在写出线程中调用 done(异常或None)"""
+        self._put(("write", path, text, done))
+
+    def append_error(self, file_path: str, error: str) -> None:
+        self._put(("error", file_path, error))
+
+    def call(self, func: Callable[..., Any], *args: Any) -> None:
+        """在写出线程中按顺序执行其他目标端操作（如写入结果库）"""
+        self._put(("call", func, args))
+
+    def _put(self, op: tuple) -> None:
+        # 写出线程自身（如 done 回调中）提交的操作直接执行，避免队列已满时等待自己
+        if threading.current_thread() is self._thread:
+            self._execute(op)
+        else:
+            self._queue.put(op)
+
+    def close(self) -> None:
+        """写完队列中剩余的操作后停止"""
+        self._queue.put(_STOP)
+        self._thread.join()
+        self._errors.close()
+
+    def _run(self) -> None:
+        while True:
+            batch = [self._queue.get()]
+            while len(batch) < Config.WRITER_BATCH_SIZE:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            start = time.perf_counter()
+            stop = False
+            for op in batch:
+                if op is _STOP:
+                    stop = True
+                    continue
+                self._execute(op)
+            self._flush()
+            Metrics.observe("writer_batch_size", len(batch))
+            Metrics.observe("writer_batch_seconds", time.perf_counter() - start)
+            if stop:
+                return
+
+    def _execute(self, op: tuple) -> None:
+        kind = op[0]
+        try:
+            if kind == "write":
+                _, path, text, done = op
+                try:
+                    self._write(path, text)
+                except Exception as e:
+                    done(e)
+                else:
+                    done(None)
+            elif kind == "error":
+                self._errors.write(f"文件: {op[1]}\n错误: {op[2]}\n\n")
+            else:
+                op[1](*op[2])
+        except Exception as e:
+            # 回调或结果库出错不能让写出线程退出，否则后续结果全部丢失
+            print(f"写出线程操作失败: {type(e).__name__}: {e}")
+
+    def _write(self, path: Path, text: str) -> None:
+        if path.parent not in self._dirs:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            self._dirs.add(path.parent)
+        FileProcessor.atomic_write(path, text)
+
+    def _flush(self) -> None:
+        self._errors.flush()
+        for flush in self.on_flush:
+            try:
+                flush()
+            except Exception as e:
+                print(f"写出线程刷新失败: {type(e).__name__}: {e}")
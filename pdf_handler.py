@@ -0,0 +1,148 @@
+# pdf_handler.py
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from typing import List, Optional, Tuple
+from config import Config
+from process_pool import HardTimeoutPool
+from timeout_guard import FileTooLargeError, TimeoutGuard
+import multiprocessing
+import threading
+import pdfplumber
+from pdfminer.pdfdevice import PDFDevice
+from pdfminer.pdffont import PDFUnicodeNotDefined
+from pdfminer.pdfinterp import PDFPageInterpreter, PDFResourceManager
+from pdfminer.pdfpage import PDFPage
+
+
+class _PlainTextDevice(PDFDevice):
+    """只解码文字、不计算字符几何信息的轻量设备"""
+
+    SPACE_KERNING = -250  # TJ数组中小于该值的字距视为空格
+
+    def __init__(self, rsrcmgr: PDFResourceManager):
+        super().__init__(rsrcmgr)
+        self.parts: List[str] = []
+        self._last_matrix = None
+
+    def begin_page(self, page, ctm) -> None:
+        self.parts = []
+        self._last_matrix = None
+
+    def render_string(self, textstate, seq, ncs, graphicstate) -> None:
+        matrix = tuple(textstate.matrix)
+        if self._last_matrix is not None and matrix != self._last_matrix:
+            # 文本矩阵的纵向位置变化视为换行，否则视为词间空白
+            self.parts.append("\n" if matrix[5] != self._last_matrix[5] else " ")
+        self._last_matrix = matrix
+        font = textstate.font
+        for obj in seq:
+            if isinstance(obj, (int, float)):
+                if obj < self.SPACE_KERNING:
+                    self.parts.append(" ")
+                continue
+            for cid in font.decode(obj):
+                try:
+                    self.parts.append(font.to_unichr(cid))
+                except PDFUnicodeNotDefined:
+                    pass
+
+
+def extract_page_range(file_path: str, start: int, stop: int, text_only: bool, timeout: float) -> List[str]:
+    """提取[start, stop)页的文本（在分片工作进程中执行）"""
+    with TimeoutGuard(timeout) as timer:
+        return _extract_pages(file_path, start, stop, text_only, timer)
+
+
+def _extract_pages(file_path: str, start: int, stop: int, text_only: bool, timer: TimeoutGuard) -> List[str]:
+    if text_only:
+        return _extract_plain_text(file_path, start, stop, timer)
+    texts = []
+    with pdfplumber.open(file_path) as pdf:
+        for page in pdf.pages[start:stop]:
+            timer.check_timeout()  # 每页前检查超时
+            texts.append(page.extract_text() or "")
+            page.flush_cache()
+    return texts
+
+
+def _extract_plain_text(file_path: str, start: int, stop: int, timer: TimeoutGuard) -> List[str]:
+    rsrcmgr = PDFResourceManager(caching=True)
+    device = _PlainTextDevice(rsrcmgr)
+    interpreter = PDFPageInterpreter(rsrcmgr, device)
+    texts = []
+    with open(file_path, "rb") as fp:
+        for page in PDFPage.get_pages(fp, pagenos=set(range(start, stop)), maxpages=stop):
+            timer.check_timeout()
+            interpreter.process_page(page)
+            texts.append("".join(device.parts))
+    return texts
+
+
+class PdfHandler:
+    """PDF提取：页数预算 + 长文档按页分片到多个进程并行提取
+
+    分片在可强制终止的进程池中执行：单页解析卡死时超时杀死该工作进程，不会占住进程池拖累后续文件。
+    """
+
+    _pool: Optional[HardTimeoutPool] = None
+    _pool_lock = threading.Lock()
+
+    @classmethod
+    def handle_pdf(cls, file_path: str, timer: TimeoutGuard) -> str:
+        with pdfplumber.open(file_path) as pdf:
+            page_count = len(pdf.pages)
+        if Config.PDF_MAX_PAGES:
+            page_count = min(page_count, Config.PDF_MAX_PAGES)
+        shards = cls._shards(page_count)
+        if len(shards) <= 1:
+            texts = _extract_pages(file_path, 0, page_count, Config.PDF_TEXT_ONLY, timer)
+        else:
+            texts = cls._extract_sharded(file_path, shards, timer)
+        return "\n".join(text for text in texts if text)
+
+    @classmethod
+    def _shards(cls, page_count: int) -> List[Tuple[int, int]]:
+        """将页码范围切分为连续分片；页数较少或已在工作进程中时不分片"""
+        if (
+            page_count < Config.PDF_SHARD_MIN_PAGES
+            or Config.PDF_SHARD_WORKERS <= 1
+            or multiprocessing.current_process().daemon
+        ):
+            return [(0, page_count)]
+        count = min(Config.PDF_SHARD_WORKERS, page_count // Config.PDF_SHARD_MIN_PAGES_PER_WORKER) or 1
+        size, extra = divmod(page_count, count)
+        shards, start = [], 0
+        for index in range(count):
+            stop = start + size + (1 if index < extra else 0)
+            shards.append((start, stop))
+            start = stop
+        return shards
+
+    @classmethod
+    def _extract_sharded(cls, file_path: str, shards: List[Tuple[int, int]], timer: TimeoutGuard) -> List[str]:
+        timer.check_timeout()
+        pool = cls._get_pool()
+        remaining = timer.remaining()
+        futures = [
+            pool.submit(file_path, start, stop, Config.PDF_TEXT_ONLY, remaining, timeout=remaining)
+            for start, stop in shards
+        ]
+        texts: List[str] = []
+        try:
+            for future in futures:
+                texts.extend(future.result(timeout=max(timer.remaining(), 0)))
+        except (FutureTimeoutError, FileTooLargeError):
+            # 超时信息报告本文件的预算，而不是分片提交时剩余的时间
+            raise FileTooLargeError(f"处理超时，超过 {timer.timeout} 秒")
+        finally:
+            # 未完成的分片：等待中的取消，执行中的杀死工作进程
+            for future in futures:
+                if not future.done():
+                    pool.cancel(future)
+        return texts
+
+    @classmethod
+    def _get_pool(cls) -> HardTimeoutPool:
+        with cls._pool_lock:
+            if cls._pool is None:
+                cls._pool = HardTimeoutPool(extract_page_range, Config.PDF_SHARD_WORKERS, Config.PROCESS_TIMEOUT)
+            return cls._pool
@@ -0,0 +1,127 @@
+# pipeline.py
+from typing import Any, Callable, Dict, List, Optional
+import queue
+import threading
+import time
+
+_STOP = object()
+
+
+class Stage:
+    """流水线阶段：有界输入队列 + 独立的工作线程，记录队列深度与利用率"""
+
+    def __init__(self, name: str, func: Callable[[Any], Any], workers: int, queue_size: int):
+        self.name = name
+        self.func = func
+        self.workers = max(1, workers)
+        self.queue: "queue.Queue[Any]" = queue.Queue(maxsize=queue_size)
+        self.downstream: Optional["Stage"] = None
+        self.on_error: Callable[[Any, Exception], None] = lambda item, error: None
+        self.processed = 0
+        self.failed = 0
+        self.busy_seconds = 0.0
+        self.max_depth = 0
+        self._lock = threading.Lock()
+        self._threads: List[threading.Thread] = []
+        self._started_at = 0.0
+
+    def start(self) -> None:
+        self._started_at = time.perf_counter()
+        for index in range(self.workers):
+            thread = threading.Thread(target=self._run, name=f"{self.name}-{index}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def put(self, item: Any) -> None:
+        """放入待处理项；队列满时阻塞上游（背压）"""
+        self.queue.put(item)
+        depth = self.queue.qsize()
+        if depth > self.max_depth:
+            self.max_depth = depth
+
+    def finish(self) -> None:
+        """上游已全部完成：通知工作线程退出并等待"""
+        for _ in self._threads:
+            self.queue.put(_STOP)
+        for thread in self._threads:
+            thread.join()
+
+    def stats(self) -> Dict[str, Any]:
+        elapsed = max(time.perf_counter() - self._started_at, 1e-9)
+        with self._lock:
+            return {
+                "stage": self.name,
+                "workers": self.workers,
+                "queue_depth": self.queue.qsize(),
+                "queue_capacity": self.queue.maxsize,
+                "max_queue_depth": self.max_depth,
+                "processed": self.processed,
+                "failed": self.failed,
+                "utilization": round(self.busy_seconds / (self.workers * elapsed), 3),
+            }
+
+    def _run(self) -> None:
+        while True:
+            item = self.queue.get()
+            if item is _STOP:
+                return
+            start = time.perf_counter()
+            try:
+                result = self.func(item)
+            except Exception as e:
+                result = None
+                with self._lock:
+                    self.failed += 1
+                self.on_error(item, e)
+            with self._lock:
+                self.processed += 1
+                self.busy_seconds += time.perf_counter() - start
+            if result is not None and self.downstream is not None:
+                self.downstream.put(result)
+
+
+class StagedPipeline:
+    """多阶段流水线：各阶段独立设置并发数，阶段之间以有界队列相连"""
+
+    def __init__(self, stages: List[Stage], on_error: Callable[[Any, Exception], None], report_interval: float = 0):
+        self.stages = stages
+        self.report_interval = report_interval
+        for stage, downstream in zip(stages, stages[1:] + [None]):
+            stage.downstream = downstream
+            stage.on_error = on_error
+        self._stopped = threading.Event()
+        self._reporter: Optional[threading.Thread] = None
+
+    def __enter__(self) -> "StagedPipeline":
+        for stage in self.stages:
+            stage.start()
+        if self.report_interval:
+            self._reporter = threading.Thread(target=self._report_loop, name="pipeline-report", daemon=True)
+            self._reporter.start()
+        return self
+
+    def __exit__(self, *args) -> None:
+        # 按顺序关闭：前一阶段全部完成后才通知下一阶段结束
+        for stage in self.stages:
+            stage.finish()
+        self._stopped.set()
+        if self._reporter is not None:
+            self._reporter.join()
+
+    def submit(self, item: Any) -> None:
+        self.stages[0].put(item)
+
+    def stats(self) -> List[Dict[str, Any]]:
+        return [stage.stats() for stage in self.stages]
+
+    def report(self) -> str:
+        return "\n".join(
+            f"- {s['stage']}: 队列 {s['queue_depth']}/{s['queue_capacity']}"
+            f"（峰值 {s['max_queue_depth']}），已处理 {s['processed']}，"
+            f"失败 {s['failed']}，利用率 {s['utilization']:.0%}"
+            for s in self.stats()
+        )
+
+    def _report_loop(self) -> None:
+        while not self._stopped.wait(self.report_interval):
+            print(f"流水线状态:\n{self.report()}")
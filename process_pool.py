@@ -0,0 +1,207 @@
+# process_pool.py
+from collections import deque
+from concurrent.futures import CancelledError, Future
+from multiprocessing import Pipe, Process
+from multiprocessing.connection import Connection, wait
+from typing import Any, Callable, Deque, Dict, Optional, Tuple
+from timeout_guard import FileTooLargeError
+import itertools
+import pickle
+import threading
+import time
+
+
+class WorkerCrashedError(RuntimeError):
+    """工作进程在处理任务时异常退出（如解析库段错误、内存耗尽）"""
+    pass
+
+
+def _worker_main(func: Callable[..., Any], conn: Connection) -> None:
+    """工作进程主循环"""
+    while True:
+        task = conn.recv()
+        if task is None:
+            break
+        task_id, args = task
+        try:
+            conn.send((task_id, True, func(*args)))
+        except Exception as e:
+            try:
+                pickle.dumps(e)
+            except Exception:
+                e = RuntimeError(f"{type(e).__name__}: {e}")
+            conn.send((task_id, False, e))
+
+
+class _Worker:
+    """单个工作进程，独占一条管道（被强制终止时不会影响其他进程的通信）"""
+
+    def __init__(self, worker_id: int, func: Callable[..., Any]):
+        self.worker_id = worker_id
+        self.conn, child_conn = Pipe()
+        self.process = Process(
+            target=_worker_main,
+            args=(func, child_conn),
+            name=f"extract-worker-{worker_id}",
+            daemon=True,
+        )
+        self.process.start()
+        child_conn.close()
+        # 当前任务：(任务ID, Future, 截止时间, 超时时间)
+        self.current: Optional[Tuple[int, Future, float, float]] = None
+
+    def assign(self, task_id: int, future: Future, args: Tuple, timeout: float) -> None:
+        self.current = (task_id, future, time.monotonic() + timeout, timeout)
+        self.conn.send((task_id, args))
+
+    def stop(self) -> None:
+        try:
+            self.conn.send(None)
+        except OSError:
+            pass
+
+    def kill(self) -> None:
+        self.process.kill()
+        self.process.join()
+        self.conn.close()
+
+
+class HardTimeoutPool:
+    """进程池：每个任务有墙钟截止时间（默认为池的超时时间，可按任务指定），超时则杀死并重启工作进程"""
+
+    def __init__(self, func: Callable[..., Any], workers: int, timeout: float):
+        self.func = func
+        self.timeout = timeout
+        self._pending: Deque[Tuple[int, Future, Tuple, float]] = deque()
+        self._lock = threading.Lock()
+        self._task_ids = itertools.count()
+        self._worker_ids = itertools.count()
+        self._workers: Dict[int, _Worker] = {}
+        for _ in range(max(1, workers)):
+            self._spawn()
+        self._running = True
+        self._monitor = threading.Thread(target=self._monitor_loop, name="process-pool-monitor", daemon=True)
+        self._monitor.start()
+
+    def submit(self, *args: Any, timeout: Optional[float] = None) -> Future:
+        future: Future = Future()
+        with self._lock:
+            if not self._running:
+                raise RuntimeError("进程池已关闭")
+            self._pending.append((next(self._task_ids), future, args, timeout or self.timeout))
+            self._dispatch()
+        return future
+
+    def cancel(self, future: Future) -> None:
+        """取消任务：等待中的任务直接取消；执行中的任务杀死其工作进程并重启，进程内无法中断的调用也能停止"""
+        if future.cancel():
+            return
+        with self._lock:
+            worker = next((w for w in self._workers.values() if w.current is not None and w.current[1] is future), None)
+            if worker is None:
+                return
+            worker.kill()
+            del self._workers[worker.worker_id]
+            self._spawn()
+            self._dispatch()
+        future.set_exception(CancelledError())
+
+    def shutdown(self) -> None:
+        """停止所有工作进程，未完成的任务以异常结束"""
+        with self._lock:
+            self._running = False
+        self._monitor.join()
+        with self._lock:
+            for worker in self._workers.values():
+                if worker.current is not None:
+                    worker.current[1].set_exception(RuntimeError("进程池已关闭"))
+                worker.stop()
+            for _, future, _, _ in self._pending:
+                future.set_exception(RuntimeError("进程池已关闭"))
+            self._pending.clear()
+        for worker in self._workers.values():
+            worker.process.join(timeout=1)
+            worker.kill()
+        self._workers.clear()
+
+    def __enter__(self) -> "HardTimeoutPool":
+        return self
+
+    def __exit__(self, *args) -> None:
+        self.shutdown()
+
+    def _spawn(self) -> _Worker:
+        worker = _Worker(next(self._worker_ids), self.func)
+        self._workers[worker.worker_id] = worker
+        return worker
+
+    def _dispatch(self) -> None:
+        """将等待中的任务分配给空闲工作进程（需持有锁）"""
+        for worker in self._workers.values():
+            if not self._pending:
+                return
+            if worker.current is None:
+                task_id, future, args, timeout = self._pending.popleft()
+                if future.set_running_or_notify_cancel():
+                    worker.assign(task_id, future, args, timeout)
+
+    def _monitor_loop(self) -> None:
+        while True:
+            with self._lock:
+                if not self._running:
+                    return
+                busy = {worker.conn: worker for worker in self._workers.values() if worker.current}
+            if busy:
+                ready = wait(list(busy), timeout=0.1)
+            else:
+                ready = []
+                time.sleep(0.1)
+            for conn in ready:
+                try:
+                    task_id, ok, payload = conn.recv()
+                except (EOFError, OSError):
+                    # 进程已退出，由_reap统一处理
+                    continue
+                self._complete(busy[conn].worker_id, task_id, ok, payload)
+            self._reap()
+
+    def _complete(self, worker_id: int, task_id: int, ok: bool, payload: Any) -> None:
+        with self._lock:
+            worker = self._workers.get(worker_id)
+            # 已被超时杀死的工作进程可能留下迟到的结果，直接丢弃
+            if worker is None or worker.current is None or worker.current[0] != task_id:
+                return
+            future = worker.current[1]
+            worker.current = None
+            self._dispatch()
+        if ok:
+            future.set_result(payload)
+        else:
+            future.set_exception(payload)
+
+    def _reap(self) -> None:
+        """处理超时或异常退出的工作进程并重启"""
+        now = time.monotonic()
+        failed = []
+        with self._lock:
+            for worker in list(self._workers.values()):
+                alive = worker.process.is_alive()
+                if worker.current is None:
+                    if not alive:
+                        del self._workers[worker.worker_id]
+                        self._spawn()
+                    continue
+                _, future, deadline, timeout = worker.current
+                if alive and now < deadline:
+                    continue
+                if alive:
+                    error = FileTooLargeError(f"处理超时，超过 {timeout} 秒")
+                else:
+                    error = WorkerCrashedError(f"工作进程异常退出（退出码 {worker.process.exitcode}）")
+                worker.kill()
+                del self._workers[worker.worker_id]
+                self._spawn()
+                failed.append((future, error))
+            self._dispatch()
+        for future, error in failed:
+            future.set_exception(error)
@@ -0,0 +1,86 @@
+# quarantine.py
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Iterable, Optional
+from config import Config
+from file_processor import FileProcessor
+import json
+import threading
+import time
+
+
+class Quarantine:
+    """隔离清单：记录超时或导致工作进程崩溃的文件，避免每次运行都在同一文件上耗尽超时
+
+    以内容哈希为键，文件内容变化（哈希不同）后立即重试；内容不变时在退避期满后重试，
+    退避时间从 QUARANTINE_BACKOFF 开始每次失败翻倍，不超过 QUARANTINE_MAX_BACKOFF。
+    """
+
+    def __init__(self, path: Path, entries: Optional[Dict[str, Dict]] = None):
+        self.path = path
+        self.entries: Dict[str, Dict] = entries or {}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def load(cls, target_path: str) -> "Quarantine":
+        path = Path(target_path) / Config.QUARANTINE_FILENAME
+        entries = {}
+        if path.exists():
+            try:
+                entries = json.loads(path.read_text(encoding="utf-8")).get("files", {})
+            except (OSError, ValueError) as e:
+                print(f"隔离清单读取失败，将重试全部文件: {e}")
+        return cls(path, entries)
+
+    @classmethod
+    def merge(cls, target_path: str, quarantine_files: Iterable[Path]) -> "Quarantine":
+        """合并多个分片的隔离清单（同一内容取失败次数较多的记录）"""
+        entries: Dict[str, Dict] = {}
+        for file in quarantine_files:
+            for digest, entry in json.loads(file.read_text(encoding="utf-8")).get("files", {}).items():
+                if digest not in entries or entry["failures"] > entries[digest]["failures"]:
+                    entries[digest] = entry
+        return cls(Path(target_path) / Config.QUARANTINE_FILENAME, entries)
+
+    def save(self) -> None:
+        """原子写入；清单为空时删除文件"""
+        with self._lock:
+            if not self.entries:
+                self.path.unlink(missing_ok=True)
+                return
+            data = json.dumps({"files": self.entries}, ensure_ascii=False, indent=1)
+        FileProcessor.atomic_write(self.path, data)
+
+    def blocked(self, digest: str) -> Optional[Dict]:
+        """内容仍在退避期内时返回隔离记录，否则返回None"""
+        with self._lock:
+            entry = self.entries.get(digest)
+        if entry is not None and time.time() < entry["retry_after"]:
+            return entry
+        return None
+
+    def failures(self, digest: str) -> int:
+        with self._lock:
+            entry = self.entries.get(digest)
+        return entry["failures"] if entry is not None else 0
+
+    def add(self, digest: str, file_path: str, error: Exception) -> Dict:
+        """记录一次失败并延长退避时间"""
+        now = time.time()
+        with self._lock:
+            entry = self.entries.setdefault(digest, {"failures": 0, "first_failure": now})
+            entry["failures"] += 1
+            backoff = min(Config.QUARANTINE_BACKOFF * 2 ** (entry["failures"] - 1), Config.QUARANTINE_MAX_BACKOFF)
+            entry.update(path=file_path, error=f"{type(error).__name__}: {error}",
+                         last_failure=now, retry_after=now + backoff)
+            return entry
+
+    def release(self, digest: str) -> None:
+        """重试成功后移出隔离清单"""
+        with self._lock:
+            self.entries.pop(digest, None)
+
+    @staticmethod
+    def describe(entry: Dict) -> str:
+        retry_at = datetime.fromtimestamp(entry["retry_after"]).strftime("%Y-%m-%d %H:%M")
+        return f"已隔离（失败 {entry['failures']} 次，{retry_at} 后重试）: {entry['error']}"
@@ -0,0 +1,233 @@
+# result_store.py
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, Optional, Set
+from config import Config
+from file_processor import FileProcessor
+import json
+import re
+import sqlite3
+import threading
+import time
+
+
+class ResultStore:
+    """结果库：每个文件处理完即写入SQLite，FTS5全文索引覆盖文件名、关键词、摘要及其译文
+
+    FTS5默认分词器把连续的中文当作一个词，因此建索引前在每个中文字符两侧加空格（逐字索引），
+    查询时每个检索词转为短语查询，中文检索词即按连续字符匹配。
+    结果库位于目标目录（可能是网络共享），不使用WAL，按 RESULT_COMMIT_INTERVAL 定期提交。
+    """
+
+    CJK = re.compile(r"[\u2e80-\u9fff\uf900-\ufaff]")  # 中日韩文字（不含标点）
+    COLUMNS = (
+        "path", "hash", "output", "filename", "keywords", "summary",
+        "filename_translation", "keywords_translation", "summary_translation",
+        "content", "seconds", "error", "duplicate_of", "updated",
+    )
+    FIELDS = tuple(column for column in COLUMNS if column != "content")  # 检索与导出返回的字段
+    SCHEMA = (
+        "CREATE TABLE IF NOT EXISTS documents ("
+        "path TEXT PRIMARY KEY, hash TEXT, output TEXT, filename TEXT, keywords TEXT, summary TEXT, "
+        "filename_translation TEXT, keywords_translation TEXT, summary_translation TEXT, "
+        "content TEXT, seconds REAL, error TEXT, duplicate_of TEXT, updated REAL NOT NULL)",
+        "CREATE INDEX IF NOT EXISTS idx_documents_hash ON documents(hash, filename, path)",
+        "CREATE INDEX IF NOT EXISTS idx_documents_order ON documents(filename, path)",
+        "CREATE VIRTUAL TABLE IF NOT EXISTS documents_fts USING fts5(filename, keywords, summary, translation)",
+    )
+    # 索引内容：rowid与documents一致
+    FTS_SELECT = (
+        "SELECT rowid, fts_text(filename), fts_text(keywords), fts_text(summary), "
+        "fts_text(coalesce(filename_translation, '') || ' ' || coalesce(keywords_translation, '') "
+        "|| ' ' || coalesce(summary_translation, '')) FROM documents"
+    )
+
+    def __init__(self, db_path: Path):
+        self.path = db_path
+        self._lock = threading.Lock()
+        self._last_commit = time.monotonic()
+        self._conn = sqlite3.connect(str(db_path), check_same_thread=False)
+        self._conn.create_function("fts_text", 1, self.fts_text, deterministic=True)
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        for statement in self.SCHEMA:
+            self._conn.execute(statement)
+        self._conn.commit()
+
+    @classmethod
+    def open(cls, target_path: str) -> "ResultStore":
+        return cls(Path(target_path) / Config.RESULT_DB_FILENAME)
+
+    @classmethod
+    def merge(cls, target_path: str, db_files: Iterable[Path]) -> "ResultStore":
+        """合并多个分片的结果库（各分片的文件互不重叠），重建全文索引"""
+        path = Path(target_path) / Config.RESULT_DB_FILENAME
+        path.unlink(missing_ok=True)
+        store = cls(path)
+        columns = ", ".join(cls.COLUMNS)
+        with store._lock:
+            for file in db_files:
+                store._conn.execute("ATTACH DATABASE ? AS shard", (str(file),))
+                store._conn.execute(
+                    f"INSERT OR REPLACE INTO documents ({columns}) SELECT {columns} FROM shard.documents"
+                )
+                store._conn.commit()
+                store._conn.execute("DETACH DATABASE shard")
+            store._conn.execute(f"INSERT INTO documents_fts (rowid, filename, keywords, summary, translation) "
+                                f"{cls.FTS_SELECT}")
+            store._conn.commit()
+        return store
+
+    @classmethod
+    def fts_text(cls, text: Optional[str]) -> str:
+        """逐字索引：中文字符之间加空格"""
+        return cls.CJK.sub(r" \g<0> ", text) if text else ""
+
+    @classmethod
+    def fts_query(cls, query: str) -> str:
+        """每个检索词转为短语查询（全部命中）"""
+        terms = [term.replace('"', '""') for term in query.split()]
+        return " ".join(f'"{cls.fts_text(term).strip()}"' for term in terms if term.strip('"'))
+
+    def record(self, file_path: str, digest: str, output_file: Path, analysis: Dict, translations: Dict,
+               content: str, seconds: Optional[float] = None, duplicate_of: Optional[str] = None) -> None:
+        """记录处理成功的文件；内容与已处理文件相同时 duplicate_of 为该文件"""
+        self._upsert({
+            "path": file_path,
+            "hash": digest,
+            "output": str(output_file),
+            "filename": Path(file_path).name,
+            "keywords": json.dumps(analysis["keywords"], ensure_ascii=False),
+            "summary": json.dumps(analysis["summary"], ensure_ascii=False),
+            "filename_translation": translations["filename"],
+            "keywords_translation": translations["keywords"],
+            "summary_translation": translations["summary"],
+            "content": content,
+            "seconds": seconds,
+            "error": None,
+            "duplicate_of": duplicate_of,
+        })
+
+    def record_error(self, file_path: str, digest: Optional[str], error: str) -> None:
+        """记录失败；此前成功的结果保留（与运行清单一致，输出文件不会被删除）"""
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO documents (path, hash, filename, error, updated) VALUES (?, ?, ?, ?, ?) "
+                "ON CONFLICT(path) DO UPDATE SET error = excluded.error, updated = excluded.updated",
+                (file_path, digest, Path(file_path).name, error, time.time()),
+            )
+            self._maybe_commit()
+
+    def _upsert(self, entry: Dict) -> None:
+        entry["updated"] = time.time()
+        columns = ", ".join(self.COLUMNS)
+        placeholders = ", ".join("?" * len(self.COLUMNS))
+        updates = ", ".join(f"{column} = excluded.{column}" for column in self.COLUMNS[1:])
+        with self._lock:
+            self._conn.execute(
+                f"INSERT INTO documents ({columns}) VALUES ({placeholders}) ON CONFLICT(path) DO UPDATE SET {updates}",
+                [entry[column] for column in self.COLUMNS],
+            )
+            self._conn.execute("DELETE FROM documents_fts WHERE rowid = (SELECT rowid FROM documents WHERE path = ?)",
+                               (entry["path"],))
+            self._conn.execute(f"INSERT INTO documents_fts (rowid, filename, keywords, summary, translation) "
+                               f"{self.FTS_SELECT} WHERE path = ?", (entry["path"],))
+            self._maybe_commit()
+
+    def _delete(self, condition: str, params: tuple = ()) -> None:
+        """删除记录及其索引（需持有锁）"""
+        self._conn.execute(f"DELETE FROM documents_fts WHERE rowid IN (SELECT rowid FROM documents WHERE {condition})",
+                           params)
+        self._conn.execute(f"DELETE FROM documents WHERE {condition}", params)
+
+    def _maybe_commit(self) -> None:
+        """距上次提交超过间隔时提交（需持有锁）"""
+        if time.monotonic() - self._last_commit >= Config.RESULT_COMMIT_INTERVAL:
+            self._conn.commit()
+            self._last_commit = time.monotonic()
+
+    def flush(self) -> None:
+        with self._lock:
+            self._conn.commit()
+            self._last_commit = time.monotonic()
+
+    def paths(self) -> Set[str]:
+        """已有结果的源文件"""
+        with self._lock:
+            return {row[0] for row in self._conn.execute("SELECT path FROM documents WHERE content IS NOT NULL")}
+
+    def prune(self, seen: Iterable[str]) -> None:
+        """移除已被删除的源文件记录"""
+        with self._lock:
+            self._conn.execute("CREATE TEMP TABLE IF NOT EXISTS seen (path TEXT PRIMARY KEY)")
+            self._conn.execute("DELETE FROM seen")
+            self._conn.executemany("INSERT OR IGNORE INTO seen VALUES (?)", ((path,) for path in seen))
+            self._delete("path NOT IN (SELECT path FROM seen)")
+            self._conn.execute("DROP TABLE seen")
+            self._conn.commit()
+
+    def overview(self) -> Iterator[str]:
+        """按源文件名顺序流式返回结果内容；相同内容只返回一次（取文件名最靠前者），并列出内容相同的其他文件"""
+        self.flush()
+        # 独立连接逐行读取，不把全部结果载入内存
+        reader = self._reader()
+        try:
+            cursor = reader.execute(
+                "SELECT path, hash, content FROM documents d WHERE content IS NOT NULL AND NOT EXISTS ("
+                "SELECT 1 FROM documents e WHERE e.hash = d.hash AND e.content IS NOT NULL "
+                "AND (e.filename, e.path) < (d.filename, d.path)) ORDER BY filename, path"
+            )
+            for path, digest, content in cursor:
+                duplicates = [row[0] for row in reader.execute(
+                    "SELECT path FROM documents WHERE hash = ? AND path != ? AND content IS NOT NULL "
+                    "ORDER BY filename, path", (digest, path)
+                )]
+                if duplicates:
+                    content += "\n相同内容文件:\n" + "\n".join(duplicates)
+                yield content
+        finally:
+            reader.close()
+
+    def search(self, query: str, limit: int = 20) -> List[Dict]:
+        """全文检索：空白分隔的检索词须全部命中，按相关度排序"""
+        match = self.fts_query(query)
+        if not match:
+            return []
+        columns = ", ".join(f"d.{column}" for column in self.FIELDS)
+        reader = self._reader()
+        try:
+            rows = reader.execute(
+                f"SELECT {columns} FROM documents_fts JOIN documents d ON d.rowid = documents_fts.rowid "
+                f"WHERE documents_fts MATCH ? ORDER BY bm25(documents_fts) LIMIT ?",
+                (match, limit),
+            ).fetchall()
+        finally:
+            reader.close()
+        return [self._document(row) for row in rows]
+
+    def export_jsonl(self, file_path: Path) -> int:
+        """流式导出全部记录为JSON Lines，返回记录数"""
+        self.flush()
+        count = 0
+        reader = self._reader()
+        try:
+            with FileProcessor.atomic_open(file_path) as output:
+                for row in reader.execute(f"SELECT {', '.join(self.FIELDS)} FROM documents ORDER BY filename, path"):
+                    output.write(json.dumps(self._document(row), ensure_ascii=False) + "\n")
+                    count += 1
+        finally:
+            reader.close()
+        return count
+
+    def _document(self, row: tuple) -> Dict:
+        document = dict(zip(self.FIELDS, row))
+        for column in ("keywords", "summary"):
+            document[column] = json.loads(document[column]) if document[column] else []
+        return document
+
+    def _reader(self) -> sqlite3.Connection:
+        """只读查询使用独立连接，不阻塞写入"""
+        return sqlite3.connect(str(self.path))
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.commit()
+            self._conn.close()
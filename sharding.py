@@ -0,0 +1,93 @@
+# sharding.py
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional
+from config import Config
+import hashlib
+import os
+import re
+
+
+class Shard:
+    """文件分片：按源目录相对路径的哈希把每个文件确定性地分配到 N 个分片之一
+
+    各分片可以在不同主机上运行，输出到共享或各自的目标目录；清单、错误日志等
+    汇总文件带分片后缀，互不覆盖，最后用 merge 合并。
+    """
+
+    SUFFIX_PATTERN = re.compile(r"\.shard-(\d+)-of-(\d+)$")
+
+    def __init__(self, index: int, count: int):
+        if count < 1 or not 0 <= index < count:
+            raise ValueError(f"无效的分片: {index}/{count}（应满足 0 <= i < N）")
+        self.index = index
+        self.count = count
+
+    @classmethod
+    def parse(cls, spec: str) -> "Shard":
+        """解析 "i/N" 形式的分片参数（i 从0开始）"""
+        try:
+            index, count = (int(part) for part in spec.split("/"))
+        except ValueError:
+            raise ValueError(f"无效的分片参数: {spec}（格式为 i/N）")
+        return cls(index, count)
+
+    @staticmethod
+    def key(file_path: str, source_path: str) -> str:
+        """分片依据：统一为 / 分隔的相对路径，不同主机的挂载位置不影响分配结果"""
+        return os.path.relpath(file_path, source_path).replace("\\", "/")
+
+    def contains(self, file_path: str, source_path: str) -> bool:
+        digest = hashlib.sha1(self.key(file_path, source_path).encode("utf-8")).digest()
+        return int.from_bytes(digest[:8], "big") % self.count == self.index
+
+    @property
+    def suffix(self) -> str:
+        return f".shard-{self.index}-of-{self.count}"
+
+    def filename(self, name: str) -> str:
+        """在扩展名前加入分片后缀：!处理清单.json -> !处理清单.shard-0-of-4.json"""
+        path = Path(name)
+        return f"{path.stem}{self.suffix}{path.suffix}"
+
+    def apply(self) -> None:
+        """本进程的汇总文件改用带分片后缀的文件名"""
+        for attr in ("MANIFEST_FILENAME", "COMBINED_FILENAME", "ERROR_FILENAME", "RESULT_DB_FILENAME",
+                     "RESULT_JSONL_FILENAME", "METRICS_FILENAME", "PROMETHEUS_FILENAME", "QUARANTINE_FILENAME"):
+            setattr(Config, attr, self.filename(getattr(Config, attr)))
+
+    @staticmethod
+    def find(target_paths: Iterable[str], name: str, count: int) -> List[Path]:
+        """查找各目标目录下某个汇总文件属于 N 分片运行的全部分片（不含其他分片数的旧文件）"""
+        path = Path(name)
+        pattern = f"{path.stem}.shard-*-of-{count}{path.suffix}"
+        return sorted(file for target in target_paths for file in Path(target).glob(pattern))
+
+    @classmethod
+    def check_complete(cls, target_paths: Iterable[str], count: Optional[int] = None) -> int:
+        """确认各目标目录下的分片清单恰好是一次 N 分片运行的 0..N-1，返回 N
+
+        未指定 N 时按找到的清单推断；共享目标目录中可能留有以其他 N 运行的旧分片，
+        分片数不一致、缺少分片或同一分片出现多次时拒绝合并，避免带回已删除的文件与过期结果。
+        """
+        name = Path(Config.MANIFEST_FILENAME)
+        found: Dict[int, Dict[int, List[Path]]] = {}
+        for target in target_paths:
+            for file in Path(target).glob(f"{name.stem}.shard-*-of-*{name.suffix}"):
+                match = cls.SUFFIX_PATTERN.search(file.stem)
+                if match:
+                    index, total = int(match.group(1)), int(match.group(2))
+                    found.setdefault(total, {}).setdefault(index, []).append(file)
+        if not found:
+            raise FileNotFoundError(f"未找到分片清单: {', '.join(map(str, target_paths))}")
+        if count is None:
+            if len(found) > 1:
+                raise ValueError(f"找到分片数不同的清单（N = {', '.join(map(str, sorted(found)))}），请指定分片数")
+            count = next(iter(found))
+        shards = found.get(count, {})
+        missing = [index for index in range(count) if index not in shards]
+        if missing:
+            raise ValueError(f"缺少分片 {', '.join(f'{index}/{count}' for index in missing)}，拒绝合并")
+        repeated = [file for files in shards.values() if len(files) > 1 for file in files]
+        if repeated:
+            raise ValueError(f"同一分片有多份清单，拒绝合并: {', '.join(map(str, sorted(repeated)))}")
+        return count
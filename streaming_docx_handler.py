@@ -0,0 +1,109 @@
+# streaming_docx_handler.py
+from typing import Iterator, List
+from xml.etree.ElementTree import ParseError, fromstring, iterparse
+import posixpath
+import zipfile
+
+W = "{http://schemas.openxmlformats.org/wordprocessingml/2006/main}"
+MC = "{http://schemas.openxmlformats.org/markup-compatibility/2006}"
+REL = "{http://schemas.openxmlformats.org/package/2006/relationships}"
+
+
+class StreamingDocxHandler:
+    """流式Word文档提取：直接解析zip中的XML，不构建python-docx对象模型"""
+
+    DEFAULT_BODY_PART = "word/document.xml"  # 包关系缺失时使用
+    TIMEOUT_CHECK_INTERVAL = 256  # 每处理多少个段落检查一次超时
+
+    @classmethod
+    def handle_docx(cls, file_path: str, timer=None) -> str:
+        """按文档顺序提取正文、表格（每个单元格只输出一次）、页眉、页脚"""
+        result: List[str] = []
+        try:
+            with zipfile.ZipFile(file_path) as archive:
+                for part in cls._parts(archive):
+                    with archive.open(part) as stream:
+                        for index, text in enumerate(cls.iter_paragraphs(stream)):
+                            if timer is not None and index % cls.TIMEOUT_CHECK_INTERVAL == 0:
+                                timer.check_timeout()
+                            result.append(text)
+        except (zipfile.BadZipFile, KeyError, ParseError) as e:
+            raise ValueError(f"无法打开Word文档: {e}")
+        return "\n".join(result)
+
+    @classmethod
+    def _parts(cls, archive: zipfile.ZipFile) -> List[str]:
+        """按包关系定位正文部件（不一定叫 document.xml），随后是正文引用的页眉和页脚"""
+        body = None
+        for rel_type, target in cls._relationships(archive, "_rels/.rels", ""):
+            if rel_type.endswith("/officeDocument"):
+                body = target
+                break
+        body = body or cls.DEFAULT_BODY_PART
+        if body not in archive.namelist():
+            raise KeyError(body)
+        directory, name = posixpath.split(body)
+        rels = posixpath.join(directory, "_rels", f"{name}.rels")
+        headers, footers = [], []
+        for rel_type, target in cls._relationships(archive, rels, directory):
+            if rel_type.endswith("/header"):
+                headers.append(target)
+            elif rel_type.endswith("/footer"):
+                footers.append(target)
+        names = set(archive.namelist())
+        return [body] + [part for part in headers + footers if part in names]
+
+    @staticmethod
+    def _relationships(archive: zipfile.ZipFile, rels_part: str, base: str) -> Iterator[tuple]:
+        """产出 (关系类型, 部件路径)；跳过外部链接，关系文件不存在时不产出"""
+        try:
+            data = archive.read(rels_part)
+        except KeyError:
+            return
+        for rel in fromstring(data).iter(REL + "Relationship"):
+            target = rel.get("Target", "")
+            if rel.get("TargetMode") == "External" or not target:
+                continue
+            if target.startswith("/"):
+                part = target.lstrip("/")
+            else:
+                part = posixpath.normpath(posixpath.join(base, target))
+            yield rel.get("Type", ""), part
+
+    @staticmethod
+    def iter_paragraphs(stream) -> Iterator[str]:
+        """逐段落产出非空文本，处理完的元素立即释放"""
+        stack: List = []
+        buffers: List[List[str]] = []
+        fallback_depth = 0  # mc:Fallback 中是 mc:Choice 的重复内容，跳过
+        for event, elem in iterparse(stream, events=("start", "end")):
+            tag = elem.tag
+            if event == "start":
+                stack.append(elem)
+                if tag == MC + "Fallback":
+                    fallback_depth += 1
+                elif tag == W + "p" and not fallback_depth:
+                    buffers.append([])
+                continue
+
+            stack.pop()
+            parent = stack[-1] if stack else None
+            if tag == MC + "Fallback":
+                fallback_depth -= 1
+            elif fallback_depth:
+                pass
+            elif tag == W + "p":
+                text = "".join(buffers.pop()).strip()
+                if text:
+                    yield text
+            elif buffers and parent is not None and parent.tag == W + "r":
+                if tag == W + "t":
+                    buffers[-1].append(elem.text or "")
+                elif tag == W + "tab":
+                    buffers[-1].append("\t")
+                elif tag in (W + "br", W + "cr"):
+                    buffers[-1].append("\n")
+
+            elem.clear()
+            if parent is not None:
+                parent.remove(elem)
@@ -1,14 +1,24 @@
 # summary_generator.py
-from snownlp import SnowNLP
-from typing import Dict, Optional
+from typing import Dict, Iterator, List, Optional
 from config import Config
-from concurrent.futures import ThreadPoolExecutor, as_completed
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, as_completed, wait
 from file_processor import FileProcessor
+from manifest import DuplicateRegistry, RunManifest
+from metrics import Metrics
+from output_writer import OutputWriter
+from pipeline import Stage, StagedPipeline
+from process_pool import HardTimeoutPool, WorkerCrashedError
+from quarantine import Quarantine
+from result_store import ResultStore
+from sharding import Shard
+from text_cache import TextCache
 from text_extractor import TextExtractor
+from timeout_budget import TimeoutBudget
+from timeout_guard import FileTooLargeError, TimeoutGuard
+from functools import partial
 from pathlib import Path
 from translator import Translator
-import re
-import os
+import time
 
 
 class SummaryGenerator:
@@ -18,88 +28,324 @@ class SummaryGenerator:
         self.translator: Translator = translator
         self.error_files = {}
         self.source_path = ""
+        self.manifest: Optional[RunManifest] = None
+        self.duplicates = DuplicateRegistry()
+        self._process_pool: Optional[HardTimeoutPool] = None
+        self.pipeline_stats: List[Dict] = []
+        self.shard: Optional[Shard] = None
+        self.quarantine: Optional[Quarantine] = None
+        self.store: Optional[ResultStore] = None
+        self.writer: Optional[OutputWriter] = None
+        self.budgets = TimeoutBudget()
 
-    def process_files(self, source_path: str, target_path: str) -> None:
-        """批量处理文件"""
+    def process_files(self, source_path: str, target_path: str, shard: Optional[Shard] = None) -> None:
+        """批量处理文件（仅处理新增或变化的文件）；指定分片时只处理属于该分片的文件"""
         self.source_path = source_path
+        self.shard = shard
         output_dir = Path(target_path) / Config.OUTPUT_DIR
         output_dir.mkdir(parents=True, exist_ok=True)
+        self.manifest = RunManifest.load(target_path)
+        self.store = ResultStore.open(target_path)
+        self.manifest.retain(self.store.paths())
+        self.quarantine = Quarantine.load(target_path)
+        self.budgets = TimeoutBudget.load(Config.TIMING_STATS_PATH)
+        self.writer = OutputWriter(Path(target_path) / Config.ERROR_FILENAME, [self.store.flush])
+        self.duplicates = DuplicateRegistry()
+        seen = []
+        if Config.EXECUTION_MODE in ("process", "pipeline"):
+            # 提取与分析放到独立进程中执行，超时直接终止进程
+            self._process_pool = HardTimeoutPool(
+                extract_and_analyze, Config.PROCESS_WORKERS, Config.PROCESS_TIMEOUT
+            )
 
+        try:
+            if Config.EXECUTION_MODE == "pipeline":
+                self._run_pipeline(source_path, output_dir, seen)
+            else:
+                self._run_threaded(source_path, output_dir, seen)
+            self.manifest.prune(seen)
+            self.writer.call(self.store.prune, seen)
+        finally:
+            if self._process_pool is not None:
+                self._process_pool.shutdown()
+                self._process_pool = None
+            # 等待写出线程写完，清单只记录已落盘的结果
+            self.writer.close()
+            self.manifest.save()
+            self.store.flush()
+            self.quarantine.save()
+            self.budgets.save()
+            if Config.TEXT_CACHE_PATH:
+                TextCache(Config.TEXT_CACHE_PATH, Config.TEXT_CACHE_MAX_BYTES).trim()
+
+    def _run_threaded(self, source_path: str, output_dir: Path, seen: List[str]) -> None:
+        """线程池模式：每个线程依次完成单个文件的全部步骤"""
         with ThreadPoolExecutor(max_workers=Config.MAX_WORKERS) as executor:
-            futures = {
-                executor.submit(self._process_single_file, file, output_dir)
-                for file in FileProcessor.get_all_files(source_path)
-            }
-            for future in as_completed(futures):
+            in_flight = set()
+            for file in self._iter_files(source_path):
+                seen.append(file)
+                # 在途任务达到上限时先等待部分完成（背压），遍历与处理同时进行
+                if len(in_flight) >= Config.MAX_PENDING_FILES:
+                    done, in_flight = wait(in_flight, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        future.result()
+                in_flight.add(executor.submit(self._process_single_file, file, output_dir))
+            for future in as_completed(in_flight):
                 future.result()
 
+    def _run_pipeline(self, source_path: str, output_dir: Path, seen: List[str]) -> None:
+        """分阶段流水线模式：读取(IO线程) → 提取分析(进程池) → 翻译(单线程提交) → 写出(单线程)"""
+        size = Config.PIPELINE_QUEUE_SIZE
+        stages = [
+            Stage("read", self._stage_read, Config.PIPELINE_IO_WORKERS, size),
+            Stage("analyze", self._stage_analyze, Config.PROCESS_WORKERS, size),
+            Stage("translate", self._stage_translate, 1, size),
+            Stage("write", partial(self._stage_write, output_dir=output_dir), 1, size),
+        ]
+        pipeline = StagedPipeline(stages, self._record_error, Config.PIPELINE_REPORT_INTERVAL)
+        with pipeline:
+            for file in self._iter_files(source_path):
+                seen.append(file)
+                pipeline.submit({"path": file})
+        self.pipeline_stats = pipeline.stats()
+        print(f"流水线统计:\n{pipeline.report()}")
+
+    def _iter_files(self, source_path: str) -> Iterator[str]:
+        for file in FileProcessor.get_all_files(source_path):
+            if self.shard is None or self.shard.contains(file, source_path):
+                yield file
+
+    def _stage_read(self, item: Dict) -> Optional[Dict]:
+        """检查清单并读取文件内容计算哈希（同时预热系统缓存），重复内容不再向下游传递"""
+        state = self.manifest.check(item["path"])
+        if state is None:
+            Metrics.inc("files_total", status="unchanged", type=file_type(item["path"]))
+            return None
+        item["state"] = state
+        item["start"] = time.perf_counter()
+        if self._quarantined(item["path"], state):
+            return None
+        item["claim"] = self._claim(item["path"], state)
+        return item if item["claim"] is not None else None
+
+    def _stage_analyze(self, item: Dict) -> Dict:
+        item["analysis"] = self._extract_and_analyze(item["path"], item["state"])
+        return item
+
+    def _stage_translate(self, item: Dict) -> Dict:
+        """只提交翻译请求，不等待结果，使多个文件的请求能合并为同一批次"""
+        item["translations"] = self._submit_translations(item["path"], item["analysis"])
+        return item
+
+    def _stage_write(self, item: Dict, output_dir: Path) -> None:
+        ext = file_type(item["path"])
+        with Metrics.timer("stage_seconds", stage="translate", type=ext):
+            translations = self._collect_translations(item["translations"])
+        with Metrics.timer("stage_seconds", stage="write", type=ext):
+            self._save_results(
+                item["path"], output_dir, item["state"], item["analysis"], translations,
+                item["claim"], time.perf_counter() - item["start"],
+            )
+        Metrics.observe("file_seconds", time.perf_counter() - item["start"], type=ext)
+
+    def _record_error(self, item: Dict, error: Exception) -> None:
+        self._record_failure(item["path"], item.get("state"), error)
+        if item.get("claim") is not None:
+            item["claim"].set_exception(error)
+
+    def _record_failure(self, file_path: str, state: Optional[Dict], error: Exception) -> None:
+        """记录错误；超时或工作进程崩溃的文件加入隔离清单"""
+        self._log_error(file_path, state["hash"] if state else None, str(error))
+        Metrics.inc("files_total", status="error", type=file_type(file_path))
+        if state is not None and isinstance(error, (FileTooLargeError, WorkerCrashedError)):
+            self.quarantine.add(state["hash"], file_path, error)
+            Metrics.inc("quarantine_total", result="added", type=file_type(file_path))
+
+    def _quarantined(self, file_path: str, state: Dict) -> bool:
+        """内容处于隔离退避期内时跳过，并在错误日志中注明"""
+        entry = self.quarantine.blocked(state["hash"])
+        if entry is None:
+            return False
+        self._log_error(file_path, state["hash"], Quarantine.describe(entry))
+        Metrics.inc("files_total", status="quarantined", type=file_type(file_path))
+        return True
+
+    def _log_error(self, file_path: str, digest: Optional[str], error: str) -> None:
+        """错误随即追加到错误日志并写入结果库（经写出线程）"""
+        self.error_files[file_path] = error
+        self.writer.append_error(file_path, error)
+        self.writer.call(self.store.record_error, file_path, digest, error)
+
     def _process_single_file(self, file_path: str, output_dir: Path) -> None:
         """处理单个文件"""
+        claim = None
+        state = None
+        ext = file_type(file_path)
+        start = time.perf_counter()
         try:
-            print(file_path)
-            text = TextExtractor.extract(file_path)
-            analysis = self._analyze_text(text)
-            translations = self._generate_translations(file_path, analysis)
-            self._save_results(file_path, output_dir, analysis, translations)
+            state = self.manifest.check(file_path)
+            if state is None:
+                Metrics.inc("files_total", status="unchanged", type=ext)
+                return
+            if self._quarantined(file_path, state):
+                return
+            claim = self._claim(file_path, state)
+            if claim is None:
+                return
+            analysis = self._extract_and_analyze(file_path, state)
+            with Metrics.timer("stage_seconds", stage="translate", type=ext):
+                translations = self._generate_translations(file_path, analysis)
+            with Metrics.timer("stage_seconds", stage="write", type=ext):
+                self._save_results(
+                    file_path, output_dir, state, analysis, translations, claim, time.perf_counter() - start
+                )
+            Metrics.observe("file_seconds", time.perf_counter() - start, type=ext)
         except Exception as e:
-            self.error_files[file_path] = str(e)
+            self._record_failure(file_path, state, e)
+            if claim is not None:
+                claim.set_exception(e)
+
+    def _claim(self, file_path: str, state: Dict) -> Optional[Future]:
+        """登记内容哈希：首个文件负责处理并返回Future；重复内容的文件等结果出来后直接引用"""
+        owner, future = self.duplicates.claim(state["hash"])
+        if owner:
+            Metrics.observe("source_bytes", state["size"], type=file_type(file_path))
+            return future
+        Metrics.inc("files_total", status="duplicate", type=file_type(file_path))
+        future.add_done_callback(partial(self._record_duplicate, file_path, state))
+        return None
+
+    def _record_duplicate(self, file_path: str, state: Dict, future: Future) -> None:
+        """沿用负责处理的文件的分析与翻译，输出按本文件自己的路径确定（mirror布局写一份副本）
+
+        hash布局下与原文件共用按内容寻址的输出；两种布局下原文件之后内容变化都不会改写本文件的输出。
+        """
+        error = future.exception()
+        if error is not None:
+            self._log_error(file_path, state["hash"], str(error))
+            return
+        original = future.result()
+        result = dict(
+            original, path=file_path, state=state, seconds=None, claim=None, duplicate_of=original["path"],
+            output=self._output_path(file_path, original["output_dir"], state["hash"]),
+            content=self._format_result(file_path, original["analysis"], original["translations"]),
+        )
+        if result["output"] == original["output"]:
+            self.writer.call(self._on_written, result, None)
+        else:
+            self.writer.write(result["output"], result["content"], partial(self._on_written, result))
+
+    def _extract_and_analyze(self, file_path: str, state: Dict) -> Dict[str, list]:
+        timeout = self._timeout(file_path, state)
+        if self._process_pool is not None:
+            analysis = self._process_pool.submit(file_path, state["hash"], timeout, timeout=timeout).result()
+        else:
+            analysis = extract_and_analyze(file_path, state["hash"], timeout)
+        # 指标与剖析结果随分析结果从工作进程带回，在此汇总
+        Metrics.merge(analysis.pop("metrics", None))
+        Metrics.record_profile(file_path, analysis.pop("profile", None))
+        elapsed = analysis.pop("elapsed", None)
+        if elapsed is not None:
+            self.budgets.observe(file_type(file_path), state["size"], elapsed)
+        return analysis
+
+    def _timeout(self, file_path: str, state: Dict) -> float:
+        """本文件的超时预算：隔离后重试的文件给予最大预算，其余按历史耗时估算"""
+        if self.quarantine is not None and self.quarantine.failures(state["hash"]):
+            timeout = Config.TIMEOUT_MAX
+        else:
+            timeout = self.budgets.budget(file_type(file_path), state["size"])
+        Metrics.observe("timeout_budget_seconds", timeout, type=file_type(file_path))
+        return timeout
 
-    def _analyze_text(self, text: str) -> Dict[str, list]:
-        """执行文本分析"""
-        cleaned = re.sub(r"[^\u4e00-\u9fa5a-zA-Z0-9\s,\.!?，。！？]", "", text)
-        s = SnowNLP(cleaned)
+    @staticmethod
+    def _analyze_text(text: str) -> Dict[str, list]:
+        """执行文本分析（分析依赖的numpy/scipy/snownlp在首次分析时才导入）"""
+        from text_analyzer import TextAnalyzer
+        cleaned = Config.TEXT_CLEAN_PATTERN.sub("", text)
+        return TextAnalyzer.analyze(cleaned, Config.KEYWORDS_LIMIT, Config.SUMMARY_LENGTH)
+
+    def _generate_translations(self, file_path: str, analysis: Dict) -> Dict:
+        """生成翻译内容（先提交全部请求，由翻译线程合并为批次）"""
+        return self._collect_translations(self._submit_translations(file_path, analysis))
+
+    def _submit_translations(self, file_path: str, analysis: Dict) -> Dict:
         return {
-            "keywords": s.keywords(Config.KEYWORDS_LIMIT),
-            "summary": s.summary(Config.SUMMARY_LENGTH),
+            # 只翻译文件名主体，避免中文文件名因扩展名被误判为含英文
+            "filename": self._safe_submit(Path(file_path).stem),
+            "keywords": [self._safe_submit(kw) for kw in analysis["keywords"]],
+            "summary": self._safe_submit(",".join(analysis["summary"])),
         }
 
-    def _generate_translations(self, file_path: str, analysis: Dict) -> Dict:
-        """生成翻译内容"""
+    def _collect_translations(self, pending: Dict) -> Dict:
         return {
-            "filename": self._safe_translate(Path(file_path).name),
-            "keywords": ",".join(
-                filter(None, (self._safe_translate(kw) for kw in analysis["keywords"]))
-            ),
-            "summary": self._safe_translate(",".join(analysis["summary"])),
+            "filename": self._resolve(pending["filename"]),
+            "keywords": ",".join(filter(None, (self._resolve(kw) for kw in pending["keywords"]))),
+            "summary": self._resolve(pending["summary"]),
         }
 
-    def _safe_translate(self, text: str) -> str:
-        """带安全校验的翻译"""
-        return (
-            self.translator.translate(text) if self.translator.is_english(text) else ""
-        )
+    def _safe_submit(self, text: str) -> Optional[Future]:
+        """提交翻译（只翻译其中的英文片段，不含英文时返回None）"""
+        return self.translator.submit_text(text)
+
+    @staticmethod
+    def _resolve(future: Optional[Future]) -> str:
+        return future.result() if future is not None else ""
 
     def _save_results(
-        self, src_path: str, output_dir: Path, analysis: Dict, translations: Dict
+        self, src_path: str, output_dir: Path, state: Dict, analysis: Dict, translations: Dict,
+        claim: Future, seconds: float,
     ) -> None:
+        """生成结果内容交给写出线程；落盘后再记录到运行清单与结果库，并通知内容相同的文件"""
+        output_file = self._output_path(src_path, output_dir, state["hash"])
+        text = self._format_result(src_path, analysis, translations)
+        result = {
+            "path": src_path, "state": state, "output": output_file, "output_dir": output_dir,
+            "analysis": analysis, "translations": translations, "content": text, "seconds": seconds,
+            "claim": claim, "duplicate_of": None,
+        }
+        self.writer.write(output_file, text, partial(self._on_written, result))
+
+    @classmethod
+    def _format_result(cls, src_path: str, analysis: Dict, translations: Dict) -> str:
         content = [
             f"原文路径:{src_path}",
-            self._format_section("文件名称翻译", translations["filename"]),
-            self._format_section(
+            cls._format_section("文件名称翻译", translations["filename"]),
+            cls._format_section(
                 "关键词", analysis["keywords"], translations["keywords"]
             ),
-            self._format_section("摘要", analysis["summary"], translations["summary"]),
+            cls._format_section("摘要", analysis["summary"], translations["summary"]),
         ]
+        return "\n".join(filter(None, content))
 
-        # # 生成相对路径并创建目录结构
-        # src_path_obj = Path(src_path)
-        # # 获取相对于源目录的相对路径
-        # relative_path = src_path_obj.relative_to(Path(self.source_path).resolve())
-        # # 保持原有目录结构但去除源目录前缀
-        # output_file = output_dir / relative_path.with_suffix(".txt")
-        # # 创建必要的父目录
-        # output_file.parent.mkdir(parents=True, exist_ok=True)
-
-        # file_name = os.path.basename(src_path)
-        # target_file_name = FileProcessor.change_extension(file_name)
-        # output_file = os.path.join(output_dir, target_file_name)
+    def _on_written(self, result: Dict, error: Optional[Exception]) -> None:
+        """写出线程回调：结果文件已落盘（或写出失败）；重复内容的文件没有claim"""
+        path, state, claim = result["path"], result["state"], result["claim"]
+        if error is not None:
+            self._record_failure(path, state, error)
+            if claim is not None:
+                claim.set_exception(error)
+            return
+        self.manifest.record(path, state, result["output"], result["duplicate_of"])
+        self.store.record(path, state["hash"], result["output"], result["analysis"], result["translations"],
+                          result["content"], result["seconds"], result["duplicate_of"])
+        if claim is None:
+            return
+        self.quarantine.release(state["hash"])
+        Metrics.inc("files_total", status="processed", type=file_type(path))
+        claim.set_result(result)
 
+    def _output_path(self, src_path: str, output_dir: Path, digest: str) -> Path:
+        """按内容哈希或源目录相对路径确定输出文件，不同源文件不会重名"""
+        if Config.OUTPUT_LAYOUT == "hash":
+            return output_dir / digest[:2] / f"{digest}.txt"
         src_path_obj = Path(src_path)
-        # 直接获取文件名并替换扩展名
-        output_file = (output_dir / src_path_obj.name).with_suffix(".txt")
-        # 确保输出目录存在
-        output_file.parent.mkdir(parents=True, exist_ok=True)
-        output_file.write_text("\n".join(filter(None, content)), encoding="utf-8")
+        try:
+            relative_path = src_path_obj.relative_to(self.source_path)
+        except ValueError:
+            relative_path = Path(src_path_obj.name)
+        # 保留原扩展名（a.doc 与 a.pdf 分别输出为 a.doc.txt、a.pdf.txt）
+        return output_dir / relative_path.parent / f"{relative_path.name}.txt"
 
     @staticmethod
     def _format_section(title: str, content: list, translation: str = "") -> str:
@@ -108,3 +354,27 @@ class SummaryGenerator:
         if translation:
             parts.append(f"{title}翻译:\n{translation}")
         return "\n".join(parts)
+
+
+def file_type(file_path: str) -> str:
+    """指标中使用的文件类型标签"""
+    return Path(file_path).suffix.lower() or "none"
+
+
+def extract_and_analyze(file_path: str, digest: Optional[str] = None, timeout: Optional[float] = None) -> Dict:
+    """提取并分析单个文件（可在工作进程中执行），附带本文件的指标快照与耗时
+
+    文本来自缓存时耗时为None，不作为估算超时预算的依据。
+    """
+    start = time.perf_counter()
+    with Metrics.capture(type=file_type(file_path)) as captured, Metrics.profile() as profile:
+        with Metrics.timer("stage_seconds", stage="extract"), TimeoutGuard.budget(timeout):
+            text = TextExtractor.extract(file_path, digest)
+        Metrics.observe("extracted_chars", len(text))
+        with Metrics.timer("stage_seconds", stage="analyze"):
+            analysis = SummaryGenerator._analyze_text(text)
+    cached = captured.value("text_cache_total", result="hit")
+    analysis["elapsed"] = None if cached else time.perf_counter() - start
+    analysis["metrics"] = captured.snapshot()
+    analysis["profile"] = profile
+    return analysis
@@ -0,0 +1,119 @@
+# text_analyzer.py
+from typing import Dict, List
+from config import Config
+from metrics import Metrics
+from snownlp import normal, seg
+from scipy import sparse
+import numpy as np
+
+
+class TextAnalyzer:
+    """关键词与摘要分析：只分词一次，TextRank/BM25 以稀疏矩阵运算实现
+
+    结果与 SnowNLP(text).keywords()/summary() 等价（并列分数的先后顺序除外）。
+    """
+
+    DAMPING = 0.85
+    MAX_ITER = 200
+    MIN_DIFF = 0.001
+    BM25_K1 = 1.5
+    BM25_B = 0.75
+    WINDOW = 5  # 关键词共现窗口（与 SnowNLP 一致）
+
+    @classmethod
+    def analyze(cls, text: str, keywords_limit: int, summary_limit: int) -> Dict[str, list]:
+        sentences = normal.get_sentences(text)
+        Metrics.observe("sentences", len(sentences))
+        sentences = cls._sample(sentences, Config.ANALYSIS_MAX_SENTENCES)
+        if not sentences:
+            raise ValueError("文本内容为空")
+        docs = [normal.filter_stop(seg.seg(sentence)) for sentence in sentences]
+        vocab: Dict[str, int] = {}
+        doc_ids = [np.array([vocab.setdefault(word, len(vocab)) for word in doc], dtype=np.int64) for doc in docs]
+        words = list(vocab)
+        return {
+            "keywords": [words[i] for i in cls.keyword_rank(doc_ids, len(vocab))[:keywords_limit]],
+            "summary": [sentences[i] for i in cls.sentence_rank(doc_ids, len(vocab))[:summary_limit]],
+        }
+
+    @staticmethod
+    def _sample(sentences: List[str], limit: int) -> List[str]:
+        """句子过多时按原顺序等距抽样"""
+        if not limit or len(sentences) <= limit:
+            return sentences
+        indices = np.unique(np.linspace(0, len(sentences) - 1, limit).astype(np.int64))
+        return [sentences[i] for i in indices]
+
+    @classmethod
+    def sentence_rank(cls, doc_ids: List[np.ndarray], vocab_size: int) -> List[int]:
+        """基于BM25相似度的句子TextRank，返回按得分降序的句子下标"""
+        count = len(doc_ids)
+        lengths = np.array([len(ids) for ids in doc_ids], dtype=np.float64)
+        rows = np.repeat(np.arange(count), lengths.astype(np.int64))
+        cols = np.concatenate(doc_ids) if count else np.empty(0, dtype=np.int64)
+        tf = sparse.csr_matrix(
+            (np.ones(len(cols)), (rows, cols)), shape=(count, vocab_size)
+        )
+        tf.sum_duplicates()
+
+        df = np.bincount(tf.indices, minlength=vocab_size)
+        idf = np.log(count - df + 0.5) - np.log(df + 0.5)
+        avgdl = lengths.mean()
+        norm = cls.BM25_K1 * (1 - cls.BM25_B + cls.BM25_B * lengths / avgdl) if avgdl else np.zeros(count)
+        row_norm = np.repeat(norm, np.diff(tf.indptr))
+        scores = tf.copy()
+        scores.data = idf[tf.indices] * tf.data * (cls.BM25_K1 + 1) / (tf.data + row_norm)
+
+        # weight[i, j] = BM25(句子i作为查询, 句子j)
+        weight = (tf @ scores.T).tocsr()
+        diagonal = weight.diagonal()
+        weight_sum = np.asarray(weight.sum(axis=1)).ravel() - diagonal
+        weight_t = weight.T.tocsr()
+
+        vertex = np.ones(count)
+        for _ in range(cls.MAX_ITER):
+            share = np.divide(vertex, weight_sum, out=np.zeros(count), where=weight_sum != 0)
+            updated = (1 - cls.DAMPING) + cls.DAMPING * (weight_t @ share - diagonal * share)
+            max_diff = np.abs(updated - vertex).max()
+            vertex = updated
+            if max_diff <= cls.MIN_DIFF:
+                break
+        return np.argsort(-vertex, kind="stable").tolist()
+
+    @classmethod
+    def keyword_rank(cls, doc_ids: List[np.ndarray], vocab_size: int) -> List[int]:
+        """基于共现窗口的词TextRank，返回按得分降序的词下标（无共现的词不参与排序）"""
+        sources, targets = [], []
+        for ids in doc_ids:
+            for offset in range(1, cls.WINDOW):
+                if len(ids) <= offset:
+                    break
+                left, right = ids[:-offset], ids[offset:]
+                mask = left != right
+                sources.append(left[mask])
+                targets.append(right[mask])
+        if not sources:
+            return []
+        src = np.concatenate(sources + targets)
+        dst = np.concatenate(targets + sources)
+        adjacency = sparse.csr_matrix(
+            (np.ones(len(src)), (src, dst)), shape=(vocab_size, vocab_size)
+        )
+        adjacency.sum_duplicates()
+        adjacency.data[:] = 1.0
+        degree = np.asarray(adjacency.sum(axis=1)).ravel()
+        connected = np.flatnonzero(degree)
+        if not len(connected):
+            return []
+        adjacency = adjacency[connected][:, connected]
+        degree = degree[connected]
+        transition_t = (sparse.diags(1.0 / degree) @ adjacency).T.tocsr()
+
+        vertex = np.ones(len(connected))
+        for _ in range(cls.MAX_ITER):
+            updated = (1 - cls.DAMPING) + cls.DAMPING * (transition_t @ vertex)
+            max_diff = np.abs(updated - vertex).max()
+            vertex = updated
+            if max_diff <= cls.MIN_DIFF:
+                break
+        return connected[np.argsort(-vertex, kind="stable")].tolist()
@@ -0,0 +1,72 @@
+# text_cache.py
+from pathlib import Path
+from typing import Optional
+from file_processor import FileProcessor
+import hashlib
+import os
+import zlib
+
+
+class TextCache:
+    """提取文本缓存：按内容哈希与提取器版本寻址，zlib压缩存储，按最近使用时间淘汰
+
+    读取时会更新文件修改时间作为最近使用时间；容量淘汰由 trim() 统一执行，
+    多个工作进程可同时读写同一目录（写入通过临时文件+重命名完成）。
+    """
+
+    SUFFIX = ".zz"
+
+    def __init__(self, directory: str, max_bytes: int):
+        self.directory = Path(directory)
+        self.max_bytes = max_bytes
+
+    @staticmethod
+    def make_key(digest: str, version: str) -> str:
+        return hashlib.sha256(f"{version}:{digest}".encode("utf-8")).hexdigest()
+
+    def get(self, key: str) -> Optional[str]:
+        path = self._path(key)
+        try:
+            data = path.read_bytes()
+            os.utime(path)
+        except OSError:
+            return None
+        try:
+            return zlib.decompress(data).decode("utf-8")
+        except (zlib.error, UnicodeDecodeError):
+            path.unlink(missing_ok=True)
+            return None
+
+    def put(self, key: str, text: str) -> None:
+        path = self._path(key)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        FileProcessor.atomic_write(path, zlib.compress(text.encode("utf-8"), 1))
+
+    def trim(self) -> int:
+        """删除最久未使用的缓存直至总大小不超过上限，返回删除的文件数"""
+        if not self.directory.exists():
+            return 0
+        files = []
+        total = 0
+        for bucket in os.scandir(self.directory):
+            if not bucket.is_dir():
+                continue
+            for entry in os.scandir(bucket.path):
+                if entry.name.endswith(self.SUFFIX):
+                    stat = entry.stat()
+                    files.append((stat.st_mtime, stat.st_size, entry.path))
+                    total += stat.st_size
+        removed = 0
+        for _, size, path in sorted(files):
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+            total -= size
+            removed += 1
+        return removed
+
+    def _path(self, key: str) -> Path:
+        return self.directory / key[:2] / f"{key}{self.SUFFIX}"
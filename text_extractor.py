@@ -1,61 +1,81 @@
 # text_extractor.py
-import pdfplumber
-import openpyxl
-import win32com.client as win32
-from typing import Any, Dict
-from contextlib import contextmanager
+from typing import Any, Optional
 from config import Config
 from pathlib import Path
 from datetime import datetime
-import xlrd
+import io
 import os
-from new_docx_handler import NewDocxHandler
-from multiprocessing import Process, Queue
-from docx import Document
-from docx.document import Document as _Document
-from docx.oxml.text.paragraph import CT_P
-from docx.oxml.table import CT_Tbl
-from docx.table import Table
-from docx.text.paragraph import Paragraph
-import time
+import struct
+from timeout_guard import FileTooLargeError, TimeoutGuard
+from text_cache import TextCache
+from text_stream import SentenceReservoir, TextStream
+from metrics import Metrics
 
 
-class FileTooLargeError(Exception):
-    """文件处理超时异常"""
-    pass
+class SheetBudget:
+    """单个工作表的行数/单元格数/字符数预算"""
 
+    TIMEOUT_CHECK_INTERVAL = 1000  # 每读取多少行检查一次超时
 
-class TimeoutGuard:
-    """超时保护上下文管理器"""
+    def __init__(self):
+        self.rows = 0
+        self.cells = 0
+        self.chars = 0
 
-    def __init__(self, timeout):
-        self.timeout = timeout
-        self.start_time = None
+    def consume(self, cells: int, chars: int) -> bool:
+        """计入一行；超出任一预算时返回False"""
+        self.rows += 1
+        self.cells += cells
+        self.chars += chars
+        return (
+            self.rows <= Config.SHEET_MAX_ROWS
+            and self.cells <= Config.SHEET_MAX_CELLS
+            and self.chars <= Config.SHEET_MAX_CHARS
+        )
 
-    def __enter__(self):
-        self.start_time = time.time()
-        return self
 
-    def __exit__(self, *args):
-        pass
-
-    def check_timeout(self):
-        duration = time.time() - self.start_time
-        if duration > self.timeout:
-            raise FileTooLargeError(f"处理超时，超过 {self.timeout} 秒")
-        else:
-            print(f"时间已过：{duration:2f}")
+class TextExtractor:
+    """多格式文本提取器（新增超时机制）
 
+    按扩展名分派到 _handle_<扩展名>；各格式依赖的库在对应处理方法内导入，
+    只有遇到该格式的第一个文件时才加载。
+    """
 
-class TextExtractor:
-    """多格式文本提取器（新增超时机制）"""
+    VERSION = "2"  # 提取逻辑变化时递增，使已缓存的文本失效；也计入运行清单的配置指纹，已有结果随之重新处理
+    _cache: Optional[TextCache] = None
 
     @classmethod
-    def extract(cls, file_path: str) -> str:
-        """统一入口方法（添加超时控制）"""
+    def extract(cls, file_path: str, digest: Optional[str] = None) -> str:
+        """统一入口方法（添加超时控制）；提供内容哈希时优先读取文本缓存"""
         ext = Path(file_path).suffix.lower()
+        cache = cls._get_cache() if digest else None
+        if cache is not None:
+            key = TextCache.make_key(digest, cls._cache_version(ext))
+            text = cache.get(key)
+            Metrics.inc("text_cache_total", result="miss" if text is None else "hit")
+            if text is not None:
+                return text
         handler = getattr(cls, f"_handle_{ext[1:]}", cls._handle_unsupported)
-        return handler(file_path)
+        text = handler(file_path)
+        if cache is not None:
+            cache.put(key, text)
+        return text
+
+    @classmethod
+    def _get_cache(cls) -> Optional[TextCache]:
+        if cls._cache is None and Config.TEXT_CACHE_PATH:
+            cls._cache = TextCache(Config.TEXT_CACHE_PATH, Config.TEXT_CACHE_MAX_BYTES)
+        return cls._cache
+
+    @classmethod
+    def _cache_version(cls, ext: str) -> str:
+        """提取器版本及影响提取结果的配置"""
+        return "|".join(map(str, (
+            cls.VERSION, ext, Config.DOCX_STREAMING, Config.CELL_DELIMITER, Config.LINE_DELIMITER,
+            Config.SHEET_MAX_ROWS, Config.SHEET_MAX_CELLS, Config.SHEET_MAX_CHARS,
+            Config.PDF_MAX_PAGES, Config.PDF_TEXT_ONLY,
+            Config.TXT_MAX_CHARS, Config.TXT_MAX_SENTENCE_CHARS,
+        )))
 
     @staticmethod
     def _handle_unsupported(file_path: str) -> str:
@@ -64,37 +84,46 @@ class TextExtractor:
 
     @staticmethod
     def _handle_txt(file_path: str) -> str:
-        """分块读取文本文件"""
-        content = []
-        chunk_size = 4096  # 4KB为块单位
-        with TimeoutGuard(Config.PROCESS_TIMEOUT) as timer, \
-                open(file_path, "r", encoding="utf-8", errors="ignore") as f:
-            while True:
-                timer.check_timeout()
-                chunk = f.read(chunk_size)
-                if not chunk:
-                    break
-                content.append(chunk)
-        return "".join(content)
+        """流式读取文本文件：分块解码并清洗，超出字符预算时按句子均匀抽样"""
+        reservoir = SentenceReservoir(Config.TXT_MAX_CHARS)
+        with TimeoutGuard() as timer:
+            chunks = TextStream.iter_chunks(file_path, Config.TXT_CHUNK_BYTES, timer)
+            for sentences in TextStream.iter_sentence_batches(
+                chunks, Config.TXT_MAX_SENTENCE_CHARS, Config.TEXT_CLEAN_PATTERN
+            ):
+                reservoir.extend(sentences)
+        if reservoir.sampled:
+            Metrics.inc("txt_sampled_files_total")
+        return reservoir.text()
 
     @staticmethod
     def _handle_pdf(file_path: str) -> str:
-        """分页处理PDF，支持超时中断"""
-        text = []
-        with TimeoutGuard(Config.PROCESS_TIMEOUT) as timer, pdfplumber.open(file_path) as pdf:
-            for page in pdf.pages:
-                timer.check_timeout()  # 每页前检查超时
-                if text_content := page.extract_text():
-                    text.append(text_content)
-        return "\n".join(text)
+        """分页处理PDF（长文档按页分片并行），支持超时中断"""
+        from pdf_handler import PdfHandler
+        with TimeoutGuard() as timer:
+            return PdfHandler.handle_pdf(file_path, timer)
 
     @classmethod
     def _handle_doc(cls, file_path: str) -> str:
-        """改进的.doc处理，增加超时检查"""
+        """直接解析Word 97-2003二进制格式；解析失败且可用Word时回退到COM自动化"""
+        from doc_handler import DocHandler
+        try:
+            return DocHandler.handle_doc(file_path)
+        except (ValueError, KeyError, struct.error) as e:
+            try:
+                import win32com.client  # noqa: F401
+            except ImportError:
+                raise ValueError(f"无法处理Word文档: {e}")
+            return cls._handle_doc_com(file_path)
+
+    @classmethod
+    def _handle_doc_com(cls, file_path: str) -> str:
+        """通过Word COM自动化读取.doc，增加超时检查"""
+        import win32com.client as win32
         file_path = os.path.abspath(file_path)
         word = None
         try:
-            with TimeoutGuard(Config.PROCESS_TIMEOUT) as timer:
+            with TimeoutGuard() as timer:
                 word = win32.gencache.EnsureDispatch("Word.Application")
                 word.Visible = False
                 doc = word.Documents.Open(file_path)
@@ -112,13 +141,29 @@ class TextExtractor:
             if word:
                 word.Quit()
 
+    @classmethod
+    def _handle_docx(cls, file_path: str) -> str:
+        """处理新版Word文档；流式解析失败时回退到python-docx"""
+        if Config.DOCX_STREAMING:
+            from streaming_docx_handler import StreamingDocxHandler
+            try:
+                with TimeoutGuard() as timer:
+                    return StreamingDocxHandler.handle_docx(file_path, timer)
+            except ValueError as e:
+                print(f"流式解析Word文档失败，改用python-docx: {file_path}: {e}")
+        return cls._handle_docx_document(file_path)
+
     @staticmethod
-    def _handle_docx(file_path: str) -> str:
-        """处理新版Word文档，提取所有文本内容（包括段落、表格、页眉、页脚）"""
+    def _handle_docx_document(file_path: str) -> str:
+        """用python-docx对象模型提取所有文本内容（包括段落、表格、页眉、页脚）"""
+        from docx import Document
+        from docx.table import Table
+        from docx.text.paragraph import Paragraph
+        from new_docx_handler import NewDocxHandler
         result = []
         try:
             doc = Document(file_path)
-            with TimeoutGuard(Config.PROCESS_TIMEOUT) as timer:
+            with TimeoutGuard() as timer:
                 # 处理正文中的段落和表格
                 for block in NewDocxHandler.iter_block_items(doc):
                     timer.check_timeout()
@@ -152,65 +197,74 @@ class TextExtractor:
 
     @classmethod
     def _handle_xls(cls, file_path: str) -> str:
-        """处理旧版Excel文件"""
-        workbook = xlrd.open_workbook(file_path)
-        all_text = ""
-        with TimeoutGuard(Config.PROCESS_TIMEOUT) as timer:
-            for sheet_name in workbook.sheet_names():
-                timer.check_timeout()
-                sheet = workbook.sheet_by_name(sheet_name)
-                for row_idx in range(sheet.nrows):
+        """按行流式处理旧版Excel文件"""
+        import xlrd
+        out = io.StringIO()
+        with TimeoutGuard() as timer:
+            workbook = xlrd.open_workbook(file_path, on_demand=True)
+            try:
+                for sheet_name in workbook.sheet_names():
                     timer.check_timeout()
-                    row_data = []
-                    for col_idx in range(sheet.ncols):
-                        timer.check_timeout()
-                        cell_value = sheet.cell_value(row_idx, col_idx)
-                        # 将内容转为字符串（处理数字、日期等类型）
-                        if isinstance(cell_value, float):
-                            cell_value = str(int(cell_value)) if cell_value.is_integer() else str(cell_value)
-                        else:
-                            cell_value = str(cell_value)
-                        row_data.append(cell_value)
-                    for row in row_data:
-                        timer.check_timeout()
-                        all_text += "\t" + row
-                    all_text += "\n"
-            return all_text
+                    sheet = workbook.sheet_by_name(sheet_name)
+                    budget = SheetBudget()
+                    for row_idx in range(sheet.nrows):
+                        if row_idx % SheetBudget.TIMEOUT_CHECK_INTERVAL == 0:
+                            timer.check_timeout()
+                        row = sheet.row_values(row_idx, 0, min(sheet.ncols, Config.SHEET_MAX_CELLS))
+                        line = "".join("\t" + cls._format_xls_value(value) for value in row) + "\n"
+                        if not budget.consume(len(row), len(line)):
+                            break
+                        out.write(line)
+                    workbook.unload_sheet(sheet_name)
+            finally:
+                workbook.release_resources()
+        return out.getvalue()
 
     @classmethod
     def _handle_xlsx(cls, file_path: str) -> str:
-        """处理新版Excel文件"""
-        with TimeoutGuard(Config.PROCESS_TIMEOUT) as timer:
-            workbook = openpyxl.load_workbook(file_path, data_only=True)
-            xlsx_str = ""
-            xlsx_dict = cls._process_excel(workbook)
-            for key in xlsx_dict.keys():
-                timer.check_timeout()
-                value = xlsx_dict[key]
-                xlsx_str += key + "\n"
-                xlsx_str += value + "\n"
-            return xlsx_str
+        """以只读模式流式处理新版Excel文件"""
+        import openpyxl
+        out = io.StringIO()
+        with TimeoutGuard() as timer:
+            workbook = openpyxl.load_workbook(file_path, read_only=True, data_only=True)
+            try:
+                for sheet in workbook.worksheets:
+                    timer.check_timeout()
+                    out.write(sheet.title + "\n")
+                    cls._process_sheet(sheet, out, timer)
+                    out.write("\n")
+            finally:
+                workbook.close()
+        return out.getvalue()
 
     @classmethod
-    def _process_excel(cls, workbook: Any) -> Dict[str, str]:
-        """通用Excel处理逻辑"""
-        results = {}
-        with TimeoutGuard(Config.PROCESS_TIMEOUT) as timer:
-            for sheet in workbook.worksheets:
+    def _process_sheet(cls, sheet: Any, out: io.StringIO, timer: TimeoutGuard) -> None:
+        """逐行写出工作表内容，超出预算时截断"""
+        budget = SheetBudget()
+        first = True
+        for row_idx, row in enumerate(sheet.iter_rows(values_only=True)):
+            if row_idx % SheetBudget.TIMEOUT_CHECK_INTERVAL == 0:
                 timer.check_timeout()
-                lines = []
-                for row in sheet.iter_rows():
-                    timer.check_timeout()
-                    cells = [cls._format_cell(cell) for cell in row]
-                    if any(cells):
-                        lines.append(Config.CELL_DELIMITER.join(cells))
-                results[sheet.title] = Config.LINE_DELIMITER.join(lines)
-            return results
+            cells = [cls._format_value(value) for value in row]
+            line = Config.CELL_DELIMITER.join(cells) if any(cells) else ""
+            if not budget.consume(len(cells), len(line)):
+                break
+            if line:
+                if not first:
+                    out.write(Config.LINE_DELIMITER)
+                out.write(line)
+                first = False
+
+    @staticmethod
+    def _format_xls_value(value: Any) -> str:
+        """将xls单元格内容转为字符串（处理数字、日期等类型）"""
+        if isinstance(value, float):
+            return str(int(value)) if value.is_integer() else str(value)
+        return str(value)
 
     @staticmethod
-    def _format_cell(cell: Any) -> str:
-        """格式化单元格内容"""
-        value = cell.value
+    def _format_value(value: Any) -> str:
+        """格式化单元格值"""
         if value is None:
             return ""
         if isinstance(value, datetime):
@@ -0,0 +1,68 @@
+# text_segmenter.py
+from typing import Iterator, List, Tuple
+import re
+
+
+class TextSegmenter:
+    """翻译前的文本切分：区分中文/英文片段，并把英文片段按句子打包为不超过token预算的块"""
+
+    # 中日韩文字、CJK标点及全角字符
+    CJK = re.compile(r"([\u2e80-\u9fff\u3000-\u303f\uf900-\ufaff\uff00-\uffef]+)")
+    LATIN_WORD = re.compile(r"[A-Za-z]{2,}")
+    # 句末标点后跟空白处断开；摘要句子以逗号直接相连，逗号后紧跟字母处也断开（不拆分 1,000、3.5）
+    BOUNDARY = re.compile(r"(?<=[.!?;])\s+|(?<=,)\s*(?=[A-Za-z])")
+    TOKEN = re.compile(r"\w+|[^\w\s]")
+
+    @classmethod
+    def split(cls, text: str) -> List[Tuple[str, bool]]:
+        """按原顺序返回 (片段, 是否需要翻译)；只有含英文单词的非中文片段需要翻译"""
+        segments = []
+        for part in cls.CJK.split(text):
+            if part:
+                translatable = not cls.CJK.fullmatch(part) and bool(cls.LATIN_WORD.search(part))
+                segments.append((part, translatable))
+        return segments
+
+    @classmethod
+    def chunk(cls, text: str, budget: int) -> List[str]:
+        """将英文片段按句子打包，每块估算token数不超过预算"""
+        chunks: List[str] = []
+        current: List[str] = []
+        used = 0
+        for sentence in cls._sentences(text, budget):
+            tokens = cls.estimate_tokens(sentence)
+            if current and used + tokens > budget:
+                chunks.append(" ".join(current))
+                current, used = [], 0
+            current.append(sentence)
+            used += tokens
+        if current:
+            chunks.append(" ".join(current))
+        return chunks
+
+    @classmethod
+    def estimate_tokens(cls, text: str) -> int:
+        """粗略估算子词数（长单词会被切成多个子词，按每6个字符计1个保守估计）"""
+        return sum(1 + len(token) // 6 for token in cls.TOKEN.findall(text))
+
+    @classmethod
+    def _sentences(cls, text: str, budget: int) -> Iterator[str]:
+        for sentence in cls.BOUNDARY.split(text):
+            sentence = sentence.strip().lstrip(",;").strip()
+            if not sentence:
+                continue
+            if cls.estimate_tokens(sentence) <= budget:
+                yield sentence
+                continue
+            # 超长句子按单词切开
+            piece: List[str] = []
+            used = 0
+            for word in sentence.split():
+                tokens = cls.estimate_tokens(word)
+                if piece and used + tokens > budget:
+                    yield " ".join(piece)
+                    piece, used = [], 0
+                piece.append(word)
+                used += tokens
+            if piece:
+                yield " ".join(piece)
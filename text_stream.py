@@ -0,0 +1,147 @@
+# text_stream.py
+from typing import Iterable, Iterator, List, Optional, Tuple
+import codecs
+import heapq
+import math
+import mmap
+import os
+import random
+import re
+
+
+class SentenceReservoir:
+    """字符预算内的句子均匀抽样：每句分配随机优先级，只保留优先级最小的句子，输出保持原顺序
+
+    预算填满后，新句子只有优先级低于当前保留句子的最大优先级 t 时才会被放入，
+    因此按几何分布（成功概率 t）直接跳过不会被放入的句子，无需逐句生成随机数。
+    """
+
+    def __init__(self, max_chars: int, seed: int = 0):
+        self.max_chars = max_chars
+        self.chars = 0
+        self.count = 0
+        self.full = False
+        # (-优先级, 序号, 句子)，堆顶为当前保留句子中优先级最大者
+        self._heap: List[Tuple[float, int, str]] = []
+        self._random = random.Random(seed)  # 固定种子，同一文件的抽样结果稳定
+        self._skip = 0
+
+    def extend(self, sentences: List[str]) -> None:
+        heap, rand = self._heap, self._random.random
+        base, pos, total = self.count, 0, len(sentences)
+        self.count += total
+        while pos < total:
+            if self.full:
+                if self._skip >= total - pos:
+                    self._skip -= total - pos
+                    return
+                pos += self._skip
+                threshold = -heap[0][0]
+                priority = rand() * threshold
+            else:
+                priority = rand()
+            sentence = sentences[pos]
+            heapq.heappush(heap, (-priority, base + pos, sentence))
+            self.chars += len(sentence)
+            while self.chars > self.max_chars:
+                self.chars -= len(heapq.heappop(heap)[2])
+                self.full = True
+            if self.full:
+                self._skip = self._next_skip(-heap[0][0] if heap else 0.0)
+            pos += 1
+
+    def _next_skip(self, threshold: float) -> int:
+        """成功概率为 threshold 的几何分布：下一个被放入的句子之前要跳过的句子数"""
+        if threshold >= 1.0:
+            return 0
+        if threshold <= 0.0:
+            return 1 << 62
+        return int(math.log(1.0 - self._random.random()) / math.log(1.0 - threshold))
+
+    @property
+    def sampled(self) -> bool:
+        return len(self._heap) < self.count
+
+    def text(self) -> str:
+        """按原顺序拼接保留的句子；抽样时保证每句以断句符结尾，避免相邻句子被误合并"""
+        kept = [sentence for _, _, sentence in sorted(self._heap, key=lambda item: item[1])]
+        if not self.sampled:
+            return "".join(kept)
+        return "".join(s if TextStream.SENTENCE_END.match(s[-1]) else s + "\n" for s in kept)
+
+
+class TextStream:
+    """大文本流式读取：mmap分块解码（自动识别编码）、逐块清洗、按句切分"""
+
+    BOMS = ((codecs.BOM_UTF8, "utf-8-sig"), (codecs.BOM_UTF16_LE, "utf-16"), (codecs.BOM_UTF16_BE, "utf-16"))
+    ENCODINGS = ("utf-8", "gb18030")  # 无BOM时依次尝试
+    DETECT_BYTES = 64 * 1024
+    # 与 snownlp.normal.get_sentences 的断句符一致
+    SENTENCE_END = re.compile(r"[，。？！；\r\n]")
+    SENTENCE = re.compile(r"[^，。？！；\r\n]*[，。？！；\r\n]")
+
+    @classmethod
+    def detect_encoding(cls, sample: bytes) -> str:
+        for bom, encoding in cls.BOMS:
+            if sample.startswith(bom):
+                return encoding
+        for encoding in cls.ENCODINGS:
+            try:
+                # 非final解码：样本末尾被截断的多字节字符不算错误
+                codecs.getincrementaldecoder(encoding)().decode(sample, final=False)
+                return encoding
+            except UnicodeDecodeError:
+                continue
+        return "utf-8"
+
+    @classmethod
+    def iter_chunks(cls, file_path: str, chunk_bytes: int, timer=None) -> Iterator[str]:
+        """逐块解码文件，内存中只保留当前块"""
+        with open(file_path, "rb") as f:
+            if os.fstat(f.fileno()).st_size == 0:
+                return
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+                advise = getattr(data, "madvise", None) if hasattr(mmap, "MADV_DONTNEED") else None
+                if advise is not None:
+                    advise(mmap.MADV_SEQUENTIAL)
+                encoding = cls.detect_encoding(data[:cls.DETECT_BYTES])
+                decoder = codecs.getincrementaldecoder(encoding)(errors="ignore")
+                chunk_bytes = max(mmap.PAGESIZE, chunk_bytes // mmap.PAGESIZE * mmap.PAGESIZE)
+                for start in range(0, len(data), chunk_bytes):
+                    if timer is not None:
+                        timer.check_timeout()
+                    text = decoder.decode(data[start:start + chunk_bytes])
+                    if advise is not None:
+                        # 已读过的页从进程映射中释放，常驻内存不随文件增大
+                        advise(mmap.MADV_DONTNEED, start, min(chunk_bytes, len(data) - start))
+                    yield text
+                yield decoder.decode(b"", final=True)
+
+    @classmethod
+    def iter_sentence_batches(cls, chunks: Iterable[str], max_sentence_chars: int,
+                              clean: Optional[re.Pattern] = None) -> Iterator[List[str]]:
+        """逐块清洗并切分句子（保留断句符），每块产出一批；无断句符的超长片段按长度切开"""
+        carry = ""
+        for chunk in chunks:
+            text = carry + (clean.sub("", chunk) if clean is not None else chunk)
+            sentences = cls.SENTENCE.findall(text)
+            consumed = sum(map(len, sentences))
+            carry = text[consumed:]
+            if len(carry) > max_sentence_chars:
+                cut = len(carry) - len(carry) % max_sentence_chars
+                sentences.append(carry[:cut])
+                carry = carry[cut:]
+            yield cls._normalize(sentences, max_sentence_chars)
+        if carry.strip():
+            yield cls._normalize([carry], max_sentence_chars)
+
+    @staticmethod
+    def _normalize(sentences: List[str], limit: int) -> List[str]:
+        """去掉空白句，切开超长句"""
+        result = []
+        for sentence in sentences:
+            if len(sentence) > limit:
+                result.extend(sentence[start:start + limit] for start in range(0, len(sentence), limit))
+            elif not sentence.isspace():
+                result.append(sentence)
+        return result
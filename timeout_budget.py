@@ -0,0 +1,65 @@
+# timeout_budget.py
+from pathlib import Path
+from typing import Dict, List, Optional
+from config import Config
+from file_processor import FileProcessor
+import json
+import threading
+
+
+class TimeoutBudget:
+    """按文件类型与大小估算单个文件的超时预算
+
+    记录每种类型最近成功处理的 (字节数, 耗时)，把耗时折算为“每 (1MB + 文件大小)”的单位耗时，
+    预算 = 单位耗时的95分位 × (1MB + 文件大小) × 安全系数，并限制在 [TIMEOUT_MIN, TIMEOUT_MAX] 内。
+    1MB 的固定项近似打开文件、加载解析库等与大小无关的开销。
+    """
+
+    QUANTILE = 0.95
+    MB = 1024 * 1024
+
+    def __init__(self, path: Optional[Path] = None, history: Optional[Dict[str, List[List[float]]]] = None):
+        self.path = path
+        self.history: Dict[str, List[List[float]]] = history or {}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def load(cls, stats_path: str) -> "TimeoutBudget":
+        if not stats_path:
+            return cls()
+        path = Path(stats_path)
+        history = {}
+        if path.exists():
+            try:
+                history = json.loads(path.read_text(encoding="utf-8"))
+            except (OSError, ValueError) as e:
+                print(f"历史耗时读取失败，将使用默认超时: {e}")
+        return cls(path, history)
+
+    def save(self) -> None:
+        if self.path is None:
+            return
+        with self._lock:
+            data = json.dumps(self.history)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        FileProcessor.atomic_write(self.path, data)
+
+    def observe(self, ext: str, size: int, seconds: float) -> None:
+        """记录一次成功处理的耗时（提取文本命中缓存的文件不应记录）"""
+        with self._lock:
+            records = self.history.setdefault(ext, [])
+            records.append([size, round(seconds, 4)])
+            del records[:-Config.TIMEOUT_HISTORY_SIZE]
+
+    def budget(self, ext: str, size: int) -> float:
+        """单个文件的超时预算（秒）；历史记录不足时使用 PROCESS_TIMEOUT"""
+        if not Config.ADAPTIVE_TIMEOUT:
+            return Config.PROCESS_TIMEOUT
+        with self._lock:
+            records = list(self.history.get(ext, ()))
+        if len(records) < Config.TIMEOUT_MIN_SAMPLES:
+            return Config.PROCESS_TIMEOUT
+        rates = sorted(seconds / (1 + recorded / self.MB) for recorded, seconds in records)
+        rate = rates[min(len(rates) - 1, int(self.QUANTILE * len(rates)))]
+        estimate = rate * (1 + size / self.MB) * Config.TIMEOUT_SAFETY_FACTOR
+        return round(min(Config.TIMEOUT_MAX, max(Config.TIMEOUT_MIN, estimate)), 1)
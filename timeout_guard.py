@@ -0,0 +1,54 @@
+# timeout_guard.py
+from contextlib import contextmanager
+from typing import Iterator, Optional
+from config import Config
+import threading
+import time
+
+
+class FileTooLargeError(Exception):
+    """文件处理超时异常"""
+    pass
+
+
+class TimeoutGuard:
+    """超时保护上下文管理器
+
+    未指定超时时间时使用当前线程的文件预算（见 budget），没有预算时使用 PROCESS_TIMEOUT。
+    """
+
+    _local = threading.local()
+
+    def __init__(self, timeout: Optional[float] = None):
+        self.timeout = timeout if timeout is not None else self.current_budget()
+        self.start_time = None
+
+    @classmethod
+    def current_budget(cls) -> float:
+        return getattr(cls._local, "budget", None) or Config.PROCESS_TIMEOUT
+
+    @classmethod
+    @contextmanager
+    def budget(cls, timeout: Optional[float]) -> Iterator[None]:
+        """在当前线程内为单个文件设置超时预算"""
+        previous = getattr(cls._local, "budget", None)
+        cls._local.budget = timeout
+        try:
+            yield
+        finally:
+            cls._local.budget = previous
+
+    def __enter__(self):
+        self.start_time = time.time()
+        return self
+
+    def __exit__(self, *args):
+        pass
+
+    def remaining(self) -> float:
+        """剩余可用时间（秒）"""
+        return self.timeout - (time.time() - self.start_time)
+
+    def check_timeout(self):
+        if time.time() - self.start_time > self.timeout:
+            raise FileTooLargeError(f"处理超时，超过 {self.timeout} 秒")
@@ -0,0 +1,138 @@
+# translation_cache.py
+from collections import OrderedDict
+from pathlib import Path
+from typing import Dict, Iterable, Optional, Tuple
+import hashlib
+import json
+import re
+import sqlite3
+import threading
+import time
+
+
+class TranslationCache:
+    """两级翻译缓存：进程内LRU + SQLite持久化存储"""
+
+    _WHITESPACE = re.compile(r"\s+")
+
+    def __init__(self, db_path: Optional[str], memory_size: int, disk_size: int):
+        self.memory_size = memory_size
+        self.disk_size = disk_size
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self._memory: "OrderedDict[str, str]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._conn: Optional[sqlite3.Connection] = None
+        self._inserts_since_trim = 0
+        # 磁盘命中的键：读取时不写库（避免读路径开启写事务长期持锁），与下次写入一起提交
+        self._touched: Dict[str, float] = {}
+        if db_path:
+            Path(db_path).parent.mkdir(parents=True, exist_ok=True)
+            self._conn = sqlite3.connect(db_path, check_same_thread=False)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS translations ("
+                "key TEXT PRIMARY KEY, result TEXT NOT NULL, last_used REAL NOT NULL)"
+            )
+            self._conn.execute(
+                "CREATE INDEX IF NOT EXISTS idx_translations_last_used ON translations(last_used)"
+            )
+            self._conn.commit()
+
+    @classmethod
+    def normalize(cls, text: str) -> str:
+        """规范化输入文本（去除首尾空白并合并连续空白）"""
+        return cls._WHITESPACE.sub(" ", text).strip()
+
+    @staticmethod
+    def make_key(model: str, params: Dict, text: str) -> str:
+        """以模型名、生成参数和规范化文本计算缓存键"""
+        raw = json.dumps([model, params, text], sort_keys=True, ensure_ascii=False)
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    def get(self, key: str) -> Optional[str]:
+        with self._lock:
+            result = self._memory.get(key)
+            if result is not None:
+                self._memory.move_to_end(key)
+                self.hits += 1
+                return result
+            if self._conn is not None:
+                row = self._conn.execute(
+                    "SELECT result FROM translations WHERE key = ?", (key,)
+                ).fetchone()
+                if row is not None:
+                    self._touched[key] = time.time()
+                    self._remember(key, row[0])
+                    self.hits += 1
+                    self.disk_hits += 1
+                    return row[0]
+            self.misses += 1
+            return None
+
+    def put_many(self, items: Iterable[Tuple[str, str]]) -> None:
+        """批量写入（翻译失败的结果不应写入）"""
+        items = list(items)
+        if not items:
+            return
+        with self._lock:
+            for key, result in items:
+                self._remember(key, result)
+            if self._conn is None:
+                return
+            now = time.time()
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO translations (key, result, last_used) VALUES (?, ?, ?)",
+                [(key, result, now) for key, result in items],
+            )
+            self._write_touched()
+            self._inserts_since_trim += len(items)
+            if self._inserts_since_trim >= max(1, self.disk_size // 100):
+                self._trim_disk()
+            self._conn.commit()
+
+    def stats(self) -> Dict[str, int]:
+        return {"hits": self.hits, "disk_hits": self.disk_hits, "misses": self.misses}
+
+    def flush(self) -> None:
+        """执行容量淘汰并提交到磁盘"""
+        with self._lock:
+            if self._conn is not None:
+                self._write_touched()
+                self._trim_disk()
+                self._conn.commit()
+
+    def close(self) -> None:
+        self.flush()
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+    def _remember(self, key: str, result: str) -> None:
+        self._memory[key] = result
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.memory_size:
+            self._memory.popitem(last=False)
+
+    def _write_touched(self) -> None:
+        """写回磁盘命中记录的最近使用时间（需持有锁，由调用方提交）"""
+        if self._touched:
+            self._conn.executemany(
+                "UPDATE translations SET last_used = ? WHERE key = ?",
+                [(used, key) for key, used in self._touched.items()],
+            )
+            self._touched.clear()
+
+    def _trim_disk(self) -> None:
+        """按最近使用时间淘汰超出容量上限的记录"""
+        self._inserts_since_trim = 0
+        (count,) = self._conn.execute("SELECT COUNT(*) FROM translations").fetchone()
+        overflow = count - self.disk_size
+        if overflow > 0:
+            self._conn.execute(
+                "DELETE FROM translations WHERE key IN ("
+                "SELECT key FROM translations ORDER BY last_used LIMIT ?)",
+                (overflow,),
+            )
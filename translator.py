@@ -1,19 +1,72 @@
 # translator.py
-from transformers import AutoModelForSeq2SeqLM, AutoTokenizer
-from typing import Optional, Tuple
+from concurrent.futures import Future
+from typing import TYPE_CHECKING, Dict, List, Optional, Tuple, Union
 from config import Config
+from metrics import Metrics
+from translation_cache import TranslationCache
+from text_segmenter import TextSegmenter
+import os
+import threading
+import queue
+import time
+
+if TYPE_CHECKING:
+    from transformers import AutoModelForSeq2SeqLM, AutoTokenizer
 
 class Translator:
-    """多语言翻译处理器"""
-    
-    def __init__(self):
-        self.model, self.tokenizer = self._load_model()
+    """多语言翻译处理器（模型在首次生成时加载，也可调用 preload() 在后台提前加载）"""
+
+    GENERATION_KWARGS = {
+        "repetition_penalty": 1.5,
+        "no_repeat_ngram_size": 2,
+    }
+
+    def __init__(self, cache: Optional[TranslationCache] = None):
+        self.model: Optional["AutoModelForSeq2SeqLM"] = None
+        self.tokenizer: Optional["AutoTokenizer"] = None
+        self._model_lock = threading.Lock()
+        self._model_error: Optional[Exception] = None
+        self.cache = cache if cache is not None else TranslationCache(
+            Config.TRANSLATION_CACHE_PATH,
+            memory_size=Config.TRANSLATION_CACHE_MEMORY_SIZE,
+            disk_size=Config.TRANSLATION_CACHE_DISK_SIZE,
+        )
+        self._requests: "queue.Queue[Optional[Tuple[str, Future]]]" = queue.Queue()
+        self._worker: Optional[threading.Thread] = None
+        self._worker_lock = threading.Lock()
 
-    def _load_model(self) -> Tuple[AutoModelForSeq2SeqLM, AutoTokenizer]:
+    def preload(self) -> None:
+        """在后台线程加载模型，与文件遍历、提取并行；失败时在首次翻译时抛出"""
+        threading.Thread(target=self._preload, name="translator-preload", daemon=True).start()
+
+    def _preload(self) -> None:
         try:
+            self._ensure_model()
+        except Exception:
+            pass
+
+    def _ensure_model(self) -> None:
+        if self.model is not None:
+            return
+        with self._model_lock:
+            if self._model_error is not None:
+                raise self._model_error
+            if self.model is None:
+                try:
+                    self.model, self.tokenizer = self._load_model()
+                except Exception as e:
+                    self._model_error = e
+                    raise
+
+    def _load_model(self) -> Tuple["AutoModelForSeq2SeqLM", "AutoTokenizer"]:
+        try:
+            self._configure_threads()
+            from transformers import AutoModelForSeq2SeqLM, AutoTokenizer
             tokenizer = AutoTokenizer.from_pretrained(Config.TRANSLATION_MODEL, local_files_only=True)
+            if Config.TRANSLATION_BACKEND == "onnx":
+                return self._load_onnx_model(), tokenizer
             model = AutoModelForSeq2SeqLM.from_pretrained(Config.TRANSLATION_MODEL, local_files_only=True)
-            return model, tokenizer
+            return self._prepare_torch_model(model), tokenizer
         except Exception as e:
             raise RuntimeError(
                 f"{e}"
@@ -23,29 +76,223 @@ class Translator:
                 f"AutoModelForSeq2SeqLM.from_pretrained('{Config.TRANSLATION_MODEL}')"
             ) from e
 
+    @staticmethod
+    def _configure_threads() -> None:
+        """限制torch线程数，避免与提取线程争抢CPU（inter-op只能在首次并行计算前设置）"""
+        import torch
+        if Config.TORCH_INTRA_OP_THREADS:
+            torch.set_num_threads(Config.TORCH_INTRA_OP_THREADS)
+        if Config.TORCH_INTER_OP_THREADS:
+            try:
+                torch.set_num_interop_threads(Config.TORCH_INTER_OP_THREADS)
+            except RuntimeError:
+                pass
+
+    @staticmethod
+    def _prepare_torch_model(model):
+        import torch
+        model.eval()
+        if Config.TRANSLATION_QUANTIZE:
+            model = torch.ao.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+        return model
+
+    @staticmethod
+    def _load_onnx_model():
+        """加载本地ONNX模型；目录不存在时从本地权重导出一次"""
+        from onnxruntime import SessionOptions
+        from optimum.onnxruntime import ORTModelForSeq2SeqLM
+        options = SessionOptions()
+        if Config.TORCH_INTRA_OP_THREADS:
+            options.intra_op_num_threads = Config.TORCH_INTRA_OP_THREADS
+        if Config.TORCH_INTER_OP_THREADS:
+            options.inter_op_num_threads = Config.TORCH_INTER_OP_THREADS
+        if os.path.isdir(Config.TRANSLATION_ONNX_PATH) and os.listdir(Config.TRANSLATION_ONNX_PATH):
+            return ORTModelForSeq2SeqLM.from_pretrained(Config.TRANSLATION_ONNX_PATH, session_options=options)
+        model = ORTModelForSeq2SeqLM.from_pretrained(
+            Config.TRANSLATION_MODEL, export=True, local_files_only=True, session_options=options
+        )
+        model.save_pretrained(Config.TRANSLATION_ONNX_PATH)
+        return model
+
+    @classmethod
+    def generation_kwargs(cls) -> Dict:
+        """当前配置下的解码参数"""
+        kwargs = dict(cls.GENERATION_KWARGS, num_beams=Config.TRANSLATION_NUM_BEAMS)
+        if Config.TRANSLATION_NUM_BEAMS > 1:
+            kwargs["early_stopping"] = True
+        if Config.TRANSLATION_MAX_NEW_TOKENS:
+            kwargs["max_new_tokens"] = Config.TRANSLATION_MAX_NEW_TOKENS
+        else:
+            kwargs["max_length"] = Config.TRANSLATION_MAX_LENGTH
+        return kwargs
+
     def translate(self, text: str) -> Optional[str]:
-        """执行翻译操作"""
+        """执行翻译操作（经由批处理线程）"""
+        return self.submit(text).result()
+
+    def submit(self, text: str) -> Future:
+        """提交翻译请求，返回Future；命中缓存时直接返回，否则由模型线程攒批后统一生成"""
+        future: Future = Future()
+        text = TranslationCache.normalize(text)
+        cached = self.cache.get(self._cache_key(text))
+        Metrics.inc("translation_requests_total", cache="miss" if cached is None else "hit")
+        if cached is not None:
+            future.set_result(cached)
+            return future
+        self._ensure_worker()
+        self._requests.put((text, future))
+        return future
+
+    def submit_text(self, text: str) -> Optional[Future]:
+        """翻译任意长度的文本：只翻译英文片段，按句切块后一并提交（同批生成），结果按原顺序拼回
+
+        文本中没有需要翻译的英文时返回None；任一块翻译失败时结果为None。
+        """
+        parts: List[Union[str, List[Future]]] = []
+        pending: List[Future] = []
+        for segment, translatable in TextSegmenter.split(text):
+            if not translatable:
+                parts.append(segment)
+                continue
+            futures = [self.submit(chunk) for chunk in TextSegmenter.chunk(segment, Config.TRANSLATION_CHUNK_TOKENS)]
+            parts.append(futures)
+            pending.extend(futures)
+        if not pending:
+            return None
+        Metrics.observe("translation_chunks", len(pending))
+
+        result: Future = Future()
+        remaining = [len(pending)]
+        lock = threading.Lock()
+
+        def on_done(_: Future) -> None:
+            with lock:
+                remaining[0] -= 1
+                if remaining[0]:
+                    return
+            try:
+                result.set_result(self._assemble(parts))
+            except Exception as e:
+                result.set_exception(e)
+
+        for future in pending:
+            future.add_done_callback(on_done)
+        return result
+
+    @staticmethod
+    def _assemble(parts: List[Union[str, List[Future]]]) -> Optional[str]:
+        output = []
+        for part in parts:
+            if isinstance(part, str):
+                output.append(part)
+                continue
+            translations = [future.result() for future in part]
+            if any(translation is None for translation in translations):
+                return None
+            output.extend(translations)
+        return "".join(output)
+
+    def translate_batch(self, texts: List[str]) -> List[Optional[str]]:
+        """对一批文本执行一次批量生成"""
+        if not texts:
+            return []
+        self._ensure_model()
+        # 同一批次内的重复文本只生成一次
+        unique = list(dict.fromkeys(texts))
         try:
-            formatted_text = f">>zho_Hans<< {text}"
-            inputs = self.tokenizer(
-                text[:Config.TRANSLATION_MAX_LENGTH],
-                return_tensors="pt",
-                padding=True,
-                truncation=True
-            )
-            outputs = self.model.generate(
-                **inputs,
-                max_length=Config.TRANSLATION_MAX_LENGTH,
-                num_beams=5,
-                early_stopping=True,
-                repetition_penalty=1.5,
-                no_repeat_ngram_size=2
-            )
-            result = self.tokenizer.decode(outputs[0], skip_special_tokens=True)
-            return result
+            decoded = self._generate(unique)
         except Exception as e:
             print(f"翻译失败: {str(e)}")
-            return None
+            return [None] * len(texts)
+        mapping = dict(zip(unique, decoded))
+        try:
+            self.cache.put_many((self._cache_key(text), result) for text, result in mapping.items())
+        except Exception as e:
+            # 缓存写入失败（如数据库被其他进程锁住）不影响已得到的译文
+            print(f"翻译缓存写入失败: {str(e)}")
+        return [mapping[text] for text in texts]
+
+    def _generate(self, texts: List[str]) -> List[str]:
+        """模型推理：编码、生成、解码"""
+        import torch
+        # 输入已按句切块，截断只作为兜底
+        inputs = self.tokenizer(
+            texts,
+            return_tensors="pt",
+            padding=True,
+            truncation=True,
+            max_length=Config.TRANSLATION_MAX_LENGTH,
+        )
+        with torch.inference_mode():
+            outputs = self.model.generate(**inputs, **self.generation_kwargs())
+        return self.tokenizer.batch_decode(outputs, skip_special_tokens=True)
+
+    def close(self) -> None:
+        """停止批处理线程（已提交的请求会先处理完）"""
+        with self._worker_lock:
+            worker, self._worker = self._worker, None
+            if worker is not None:
+                self._requests.put(None)
+        if worker is not None:
+            worker.join()
+        self.cache.flush()
+
+    def _cache_key(self, text: str) -> str:
+        # 量化与推理后端会影响输出，一并计入缓存键
+        params = dict(
+            self.generation_kwargs(),
+            backend=Config.TRANSLATION_BACKEND,
+            quantize=Config.TRANSLATION_QUANTIZE and Config.TRANSLATION_BACKEND == "torch",
+        )
+        return TranslationCache.make_key(Config.TRANSLATION_MODEL, params, text)
+
+    def _ensure_worker(self) -> None:
+        if self._worker is not None:
+            return
+        with self._worker_lock:
+            if self._worker is None:
+                self._worker = threading.Thread(
+                    target=self._batch_loop, name="translator-batch", daemon=True
+                )
+                self._worker.start()
+
+    def _batch_loop(self) -> None:
+        """模型线程：在等待窗口内或达到批大小前收集请求，然后统一生成"""
+        stopping = False
+        while not stopping:
+            item = self._requests.get()
+            if item is None:
+                break
+            batch = [item]
+            deadline = time.monotonic() + Config.TRANSLATION_BATCH_WAIT
+            while len(batch) < Config.TRANSLATION_BATCH_SIZE:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    item = self._requests.get(timeout=remaining)
+                except queue.Empty:
+                    break
+                if item is None:
+                    stopping = True
+                    break
+                batch.append(item)
+            self._run_batch(batch)
+
+    def _run_batch(self, batch: List[Tuple[str, Future]]) -> None:
+        pending = [(text, future) for text, future in batch if future.set_running_or_notify_cancel()]
+        if not pending:
+            return
+        Metrics.observe("translation_batch_size", len(pending))
+        try:
+            with Metrics.timer("translation_batch_seconds"):
+                results = self.translate_batch([text for text, _ in pending])
+        except BaseException as e:
+            for _, future in pending:
+                future.set_exception(e)
+            return
+        for (_, future), result in zip(pending, results):
+            future.set_result(result)
 
     @staticmethod
     def is_english(text: str) -> bool: